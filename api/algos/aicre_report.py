@@ -1,28 +1,47 @@
-import requests
-from api.data.zillow import scrape_zillow_data
-from api.data.census import get_census_data
-from api.data.cherre import get_cherre_data
-from api.data.zonda import get_zonda_data
+from api.algos.sources import fetch_sources
+from api.algos.sreo import sreo_index, DEFAULT_HOUSING_STOCK, DEFAULT_POPULATION_GROWTH
 
-def generate_aicre_report(address, region):
-    """Generate the AiCRE Report for a property address."""
-    # Step 1: Scrape Zillow data
-    zillow_data = scrape_zillow_data(address)
-    
-    # Step 2: Get census and economic data
-    census_data = get_census_data(region)
-    cherre_data = get_cherre_data(region)
-    zonda_data = get_zonda_data(address)
+def _to_float(value, default=0.0):
+    """Reads numbers that arrive as strings like '3.5%' or '$1,200'; default when there is none."""
+    if value is None:
+        return default
+    try:
+        return float(str(value).replace('%', '').replace('$', '').replace(',', '').strip())
+    except ValueError:
+        return default
 
-    # Step 3: Calculate SREO metrics
-    price_trend = float(zillow_data.get('trend', 0).strip('%')) / 100
-    gdp_growth = float(census_data.get('gdp', 0)) / 100
-    housing_stock = census_data.get('housing', {}).get('stock', 10000)  # Placeholder
-    population_growth = census_data.get('population', {}).get('growth', 0.02)  # Placeholder
+def generate_aicre_report(address, region, deadline=None):
+    """
+    Generate the AiCRE Report for a property address.
 
-    sre_index = (price_trend * 0.4) + (gdp_growth * 0.3) + ((population_growth / housing_stock) * 0.3)
+    All sources are fetched at once, each against its own deadline (capped by `deadline`
+    seconds if given). A source that fails or times out is listed under 'Source Errors'
+    and the report is built from the rest, with placeholders standing in.
+    """
+    # Step 1: Fetch Zillow, census and economic data concurrently
+    data, errors = fetch_sources({
+        'zillow': address,
+        'census': region,
+        'cherre': region,
+        'zonda': address,
+    }, deadline=deadline)
+    zillow_data = data.get('zillow', {})
+    census_data = data.get('census', {})
+    cherre_data = data.get('cherre', {})
+    zonda_data = data.get('zonda', {})
 
-    # Step 4: Fetch additional metrics from Cherre, Nextdoor, and Zonda for local insight
+    # Step 2: Calculate SREO metrics. Census supplies housing stock and population growth, not GDP
+    price_trend = _to_float(zillow_data.get('trend')) / 100
+    gdp_growth = _to_float(census_data.get('gdp')) / 100
+    # Census leaves a figure as None when an estimate is unavailable; placeholders stand in, as in score_properties
+    housing_stock = _to_float((census_data.get('housing') or {}).get('stock'), DEFAULT_HOUSING_STOCK)
+    if housing_stock <= 0:
+        housing_stock = DEFAULT_HOUSING_STOCK
+    population_growth = _to_float((census_data.get('population') or {}).get('growth'), DEFAULT_POPULATION_GROWTH)
+
+    sre_index = sreo_index(price_trend, gdp_growth, population_growth, housing_stock)
+
+    # Step 3: Fetch additional metrics from Cherre, Nextdoor, and Zonda for local insight
     neighborhood_metrics = cherre_data.get('neighborhood', {})
     development_trends = zonda_data.get('development_trends', {})
 
@@ -34,4 +53,5 @@ def generate_aicre_report(address, region):
         'Population Growth': population_growth,
         'Neighborhood Metrics': neighborhood_metrics,
         'Development Trends': development_trends,
+        'Source Errors': errors,
     }
@@ -0,0 +1,132 @@
+import os
+import time
+import logging
+
+from api.cache import TTLCache, SingleFlight
+from api.stages import run_stages, stage_pool
+
+# Cap on cached results per source
+SOURCE_CACHE_SIZE = int(os.getenv('SOURCE_CACHE_SIZE', '1024'))
+
+# Pool for the concurrent source fetches of reports
+source_stages = stage_pool('source', 16)
+
+
+class DataSource:
+    """
+    One upstream a report draws on: `fetch(arg)` returns a dict, with an 'error' key on failure.
+
+    Successful results are cached per argument for `ttl` seconds (None skips the cache, for
+    sources that cache on their own). `timeout` is the source's deadline within a report.
+    Concurrent fetches of the same argument share one upstream call.
+    """
+
+    def __init__(self, name, fetch, ttl=None, timeout=None):
+        self.name = name
+        self.fetch = fetch
+        self.ttl = int(os.getenv(f"SOURCE_{name.upper()}_TTL", ttl or 0)) or None
+        self.timeout = float(os.getenv(f"SOURCE_{name.upper()}_TIMEOUT", timeout or 0)) or None
+        self._cache = TTLCache(maxsize=SOURCE_CACHE_SIZE, ttl=self.ttl) if self.ttl else None
+        self._flight = SingleFlight()
+
+    def get(self, arg):
+        if self._cache is None:
+            return self.fetch(arg)
+        data = self._cache.get(arg)
+        if data is None:
+            data = self._flight.do(arg, lambda: self._fetch_and_cache(arg))
+        return data
+
+    def _fetch_and_cache(self, arg):
+        data = self.fetch(arg)
+        if 'error' not in data:
+            self._cache.set(arg, data)
+        return data
+
+    def stats(self):
+        return self._cache.stats() if self._cache is not None else None
+
+
+class StubSource(DataSource):
+    """Offline source returning fixed data, optionally after a delay; for tests and benchmarks."""
+
+    def __init__(self, name, data, delay=0, timeout=None):
+        def fetch(arg):
+            if delay:
+                time.sleep(delay)
+            return dict(data)
+        super().__init__(name, fetch, timeout=timeout)
+
+
+_registry = {}
+
+
+def register_source(source):
+    """Adds a source, replacing any registered under the same name."""
+    _registry[source.name] = source
+    return source
+
+
+def get_source(name):
+    return _registry[name]
+
+
+def registered_sources():
+    return dict(_registry)
+
+
+def fetch_sources(args, deadline=None):
+    """
+    Fetches several sources concurrently. `args` maps a source name to the argument passed to it.
+
+    Each source runs against its own timeout, capped by `deadline` seconds if given, so the
+    call takes as long as the slowest source, not the sum. Returns (data, errors): data holds
+    every source that succeeded, errors holds a message for every source that failed,
+    returned an error or timed out.
+    """
+    sources = {name: get_source(name) for name in args}
+    stages = {name: (lambda source=sources[name], arg=arg: source.get(arg)) for name, arg in args.items()}
+    timeouts = {}
+    for name, source in sources.items():
+        limits = [t for t in (source.timeout, deadline) if t]
+        if limits:
+            timeouts[name] = min(limits)
+    results, errors = run_stages(stages, timeouts, pool=source_stages)
+
+    data = {}
+    for name, result in results.items():
+        if isinstance(result, dict) and 'error' in result:
+            logging.error(f"Source {name} returned an error: {result['error']}")
+            errors[name] = result['error']
+        else:
+            data[name] = result
+    return data, errors
+
+
+def register_default_sources():
+    """Registers the live Zillow and Census sources, and Cherre and Zonda, which report themselves as not configured."""
+    from api.tools.zillow import scrape_zillow_data
+    from api.tools.census import get_region_data
+    from api.tools.cherre import get_cherre_data
+    from api.tools.zonda import get_zonda_data
+
+    # Zillow scrapes are already cached by address in api.tools.zillow
+    register_source(DataSource('zillow', scrape_zillow_data, timeout=20))
+    register_source(DataSource('census', get_region_data, ttl=86400, timeout=10))
+    register_source(DataSource('cherre', get_cherre_data, ttl=3600, timeout=10))
+    register_source(DataSource('zonda', get_zonda_data, ttl=3600, timeout=10))
+
+
+def register_stub_sources(delay=0):
+    """Registers offline stand-ins for the default sources, returning plausible fixed data."""
+    register_source(StubSource('zillow', {'price': '$500,000', 'zestimate': '$510,000', 'trend': '3.5%'}, delay))
+    register_source(StubSource('census', {'gdp': '2.1', 'housing': {'stock': 12000},
+                                          'population': {'growth': 0.015}}, delay))
+    register_source(StubSource('cherre', {'neighborhood': {'walk_score': 72, 'median_rent': 2100}}, delay))
+    register_source(StubSource('zonda', {'development_trends': {'permits_yoy': '4%', 'new_starts': 310}}, delay))
+
+
+if os.getenv('REPORT_SOURCES', 'live') == 'stub':
+    register_stub_sources()
+else:
+    register_default_sources()
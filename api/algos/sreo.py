@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# Weight of each component in the SREO index
+SREO_WEIGHTS = {
+    'price_trend': 0.4,
+    'gdp_growth': 0.3,
+    'population_pressure': 0.3,
+}
+# Placeholders for regions without census figures
+DEFAULT_HOUSING_STOCK = 10000
+DEFAULT_POPULATION_GROWTH = 0.02
+
+# Columns read from each input frame; anything else is carried through untouched
+PROPERTY_COLUMNS = ['address', 'region', 'trend']
+REGION_COLUMNS = ['region', 'gdp', 'housing_stock', 'population_growth']
+
+
+def sreo_index(price_trend, gdp_growth, population_growth, housing_stock):
+    """SREO index from fractional components; works on scalars and on whole arrays or Series alike."""
+    return (price_trend * SREO_WEIGHTS['price_trend']
+            + gdp_growth * SREO_WEIGHTS['gdp_growth']
+            + (population_growth / housing_stock) * SREO_WEIGHTS['population_pressure'])
+
+
+def parse_numeric(values):
+    """Series of numbers that may arrive as strings like '3.5%' or '$1,200'; unparseable values become NaN."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    values = values.astype(str)
+    # Most values are plain numbers or percentages; only the rest go through the slower regex clean-up
+    parsed = pd.to_numeric(values.str.rstrip('%'), errors='coerce')
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        cleaned = values[retry].str.replace(r'[%$,\s]', '', regex=True)
+        parsed[retry] = pd.to_numeric(cleaned, errors='coerce')
+    return parsed
+
+
+def region_frame(region_data):
+    """
+    Builds the region frame from {region: figures}, as returned by the census source or
+    api.tools.census.get_region_figures. Census has no GDP figures, so 'gdp' is only set
+    when the figures include it; otherwise it must come from a supplied regions frame.
+    """
+    rows = []
+    for region, data in region_data.items():
+        rows.append({
+            'region': region,
+            'gdp': data.get('gdp'),
+            'housing_stock': data.get('housing', {}).get('stock'),
+            'population_growth': data.get('population', {}).get('growth'),
+        })
+    return pd.DataFrame(rows, columns=REGION_COLUMNS)
+
+
+def score_properties(properties, regions):
+    """
+    Scores every property at once and returns the frame ranked by SREO index, best first.
+
+    `properties` needs 'region' and 'trend' (percent) columns, `regions` needs 'region' and
+    any of 'gdp' (percent), 'housing_stock' and 'population_growth'. Properties are joined
+    to their region's figures; missing figures fall back to the placeholders (0 for trend
+    and GDP). Adds the component columns, 'sreo_index' and a 1-based 'rank'.
+    """
+    # Region figures are parsed once per region, then looked up by each property's region key
+    regions = regions.reindex(columns=REGION_COLUMNS)
+    regions = pd.DataFrame({
+        'gdp_growth': parse_numeric(regions['gdp']).fillna(0).to_numpy() / 100,
+        'housing_stock': parse_numeric(regions['housing_stock']).to_numpy(),
+        'population_growth': parse_numeric(regions['population_growth']).fillna(DEFAULT_POPULATION_GROWTH).to_numpy(),
+    }, index=regions['region'].astype(str))
+    regions = regions[~regions.index.duplicated(keep='last')]
+    regions = regions.assign(housing_stock=regions['housing_stock'].where(regions['housing_stock'] > 0, DEFAULT_HOUSING_STOCK))
+
+    region_keys = properties['region'].astype(str)
+    joined = regions.reindex(region_keys)
+    known = joined.index.isin(regions.index)
+
+    price_trend = parse_numeric(properties['trend']).fillna(0).to_numpy() / 100 if 'trend' in properties else 0.0
+    gdp_growth = np.where(known, joined['gdp_growth'].to_numpy(), 0.0)
+    housing_stock = np.where(known, joined['housing_stock'].to_numpy(), DEFAULT_HOUSING_STOCK)
+    population_growth = np.where(known, joined['population_growth'].to_numpy(), DEFAULT_POPULATION_GROWTH)
+    index = sreo_index(price_trend, gdp_growth, population_growth, housing_stock)
+
+    scored = properties.assign(
+        region=region_keys,
+        price_trend=price_trend,
+        gdp_growth=gdp_growth,
+        housing_stock=housing_stock,
+        population_growth=population_growth,
+        population_pressure=population_growth / housing_stock,
+        sreo_index=index,
+    )
+    # Stable descending order: ties keep their input order
+    order = np.argsort(-index, kind='stable')
+    scored = scored.take(order).reset_index(drop=True)
+    scored['rank'] = np.arange(1, len(scored) + 1)
+    return scored
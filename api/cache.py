@@ -0,0 +1,215 @@
+import json
+import time
+import sqlite3
+import datetime
+import threading
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe in-memory LRU cache whose entries expire after a TTL (seconds)."""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'stale': self.stale}
+
+
+class SQLiteCache:
+    """Persistent JSON cache in a local SQLite file."""
+
+    def __init__(self, path, ttl=None):
+        self.path = path
+        self.ttl = ttl
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key, default=None):
+        with self._connect() as conn:
+            row = conn.execute('SELECT value, expires_at FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return default
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?)', (key, json.dumps(value), expires_at))
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+
+class FirestoreCache:
+    """
+    Persistent JSON cache in a Firestore collection, one document per key.
+    `db` is a Firestore client, or a function returning one to defer connecting until first use.
+    """
+
+    def __init__(self, db, collection, ttl=None):
+        self._db = db
+        self._collection_name = collection
+        self._collection = None
+        self.ttl = ttl
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            db = self._db() if callable(self._db) else self._db
+            self._collection = db.collection(self._collection_name)
+        return self._collection
+
+    def get(self, key, default=None):
+        snapshot = self.collection.document(key).get()
+        if not snapshot.exists:
+            return default
+        entry = snapshot.to_dict()
+        expires_at = entry.get('expires_at')
+        if expires_at is not None and expires_at <= datetime.datetime.now(datetime.timezone.utc):
+            return default
+        return json.loads(entry['value'])
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None
+        if ttl is not None:
+            expires_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=ttl)
+        # Stored as a JSON string: extracted field names aren't always valid Firestore keys
+        self.collection.document(key).set({'value': json.dumps(value), 'expires_at': expires_at})
+
+    def delete(self, key):
+        self.collection.document(key).delete()
+
+
+class TieredCache:
+    """A local cache in front of a persistent one. Persistent hits are copied into the local tier."""
+
+    def __init__(self, local, persistent=None):
+        self.local = local
+        self.persistent = persistent
+
+    def get(self, key, default=None):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        if self.persistent is None:
+            return default
+        value = self.persistent.get(key)
+        if value is None:
+            return default
+        self.local.set(key, value)
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.local.set(key, value, ttl)
+        if self.persistent is not None:
+            self.persistent.set(key, value, ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.persistent is not None:
+            self.persistent.delete(key)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution whose result all callers share."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+
+        if not leader:
+            call['done'].wait()
+        else:
+            try:
+                call['result'] = fn()
+            except Exception as e:
+                call['error'] = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call['done'].set()
+
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+
+class Refresher:
+    """Calls `refresh()` on a daemon thread every `interval` seconds until stopped."""
+
+    def __init__(self, name, refresh):
+        self.name = name
+        self.refresh = refresh
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, interval):
+        """Starts the thread, unless interval is 0 or it is already running."""
+        if interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.is_set():
+                self.refresh()
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,356 @@
+import os
+import json
+import uuid
+import time
+import queue
+import base64
+import logging
+import datetime
+import threading
+from concurrent.futures import Future
+
+from api.metrics import timed
+
+# Firestore accepts at most 500 writes per batch
+MAX_BATCH_WRITES = 500
+DOCUMENT_BATCH_SIZE = min(int(os.getenv('DOCUMENT_BATCH_SIZE', '100')), MAX_BATCH_WRITES)
+# Seconds the writer waits for more documents before committing a partial batch
+DOCUMENT_FLUSH_INTERVAL = float(os.getenv('DOCUMENT_FLUSH_INTERVAL', '0.1'))
+# Documents waiting to be written; past this, add() blocks the caller until the writer catches up
+DOCUMENT_WRITE_QUEUE = int(os.getenv('DOCUMENT_WRITE_QUEUE', '1000'))
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Top-level fields returned by listings; the extracted blobs are only returned per document
+SUMMARY_FIELDS = ['id', 'filename', 'sha256', 'content_type', 'size', 'timestamp',
+                  'address', 'noi', 'occupancy_rate', 'tenant_count']
+# Fields a listing can be filtered on by exact value
+EQUALITY_FIELDS = ['sha256', 'content_type', 'filename']
+# Fields a listing can be filtered on by range, as min_<field>/max_<field>
+RANGE_FIELDS = ['noi', 'occupancy_rate', 'tenant_count']
+
+
+def _number(value):
+    """Reads extracted numbers like '$1,200.50' or '95%'; None when there is none."""
+    if value is None:
+        return None
+    try:
+        return float(str(value).replace('%', '').replace('$', '').replace(',', '').strip())
+    except ValueError:
+        return None
+
+
+def denormalize(property_extracted_info):
+    """The key extracted fields, flattened into top-level fields that can be indexed and filtered."""
+    info = property_extracted_info or {}
+    details = info.get('property_details') or {}
+    address = (details.get('address') or '').strip() or None
+    return {
+        'address': address,
+        # Lowercased copy for case-insensitive prefix search
+        'address_search': address.lower() if address else None,
+        'noi': _number(details.get('net_operating_income')),
+        'occupancy_rate': _number(details.get('occupancy_rate')),
+        'tenant_count': len(info.get('tenants') or []),
+    }
+
+
+def document_record(upload, gpt_extracted_info, property_extracted_info):
+    """The stored document for a processed upload."""
+    return {
+        'id': uuid.uuid4().hex,
+        'filename': upload.filename,
+        'sha256': upload.sha256,
+        'content_type': upload.content_type,
+        'size': upload.size,
+        'gpt_extracted_info': gpt_extracted_info,
+        'property_extracted_info': property_extracted_info,
+        'timestamp': datetime.datetime.utcnow(),
+        **denormalize(property_extracted_info),
+    }
+
+
+def public_document(record, fields=None):
+    """JSON-ready view of a stored document, optionally limited to `fields`."""
+    view = {key: record.get(key) for key in fields} if fields else dict(record)
+    view.pop('address_search', None)
+    if isinstance(view.get('timestamp'), datetime.datetime):
+        view['timestamp'] = view['timestamp'].replace(tzinfo=None).isoformat() + 'Z'
+    return view
+
+
+def parse_document_query(args):
+    """
+    Builds a listing query from request arguments:
+
+    - sha256, content_type, filename: exact matches
+    - address: case-insensitive address prefix
+    - min_<field>/max_<field> for noi, occupancy_rate, tenant_count
+    - limit and cursor (the next_cursor of the previous page)
+
+    Firestore orders a range filter's field first, so one query can range over a single field
+    (the address prefix counts as one). Raises ValueError for invalid arguments.
+    """
+    equals = {field: args[field] for field in EQUALITY_FIELDS if args.get(field)}
+    ranges = []
+    if args.get('address'):
+        prefix = args['address'].strip().lower()
+        # Strings starting with the prefix sort between it and the prefix followed by a high code point
+        ranges.append(('address_search', prefix, prefix + '\uf8ff'))
+    for field in RANGE_FIELDS:
+        low, high = args.get(f'min_{field}'), args.get(f'max_{field}')
+        if low is None and high is None:
+            continue
+        try:
+            ranges.append((field, float(low) if low is not None else None, float(high) if high is not None else None))
+        except ValueError:
+            raise ValueError(f"min_{field} and max_{field} must be numbers")
+    if len(ranges) > 1:
+        raise ValueError("Only one of address, noi, occupancy_rate and tenant_count can be filtered by range")
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    return {
+        'equals': equals,
+        'range': ranges[0] if ranges else None,
+        'limit': max(1, min(limit, MAX_PAGE_SIZE)),
+        'cursor': decode_cursor(args['cursor']) if args.get('cursor') else None,
+    }
+
+
+def order_for(query):
+    """(field, descending) the listing is sorted by; ties are broken by id in the same direction."""
+    if query['range'] is not None:
+        return query['range'][0], False
+    return 'timestamp', True
+
+
+def encode_cursor(record, order_field):
+    value = record.get(order_field)
+    if isinstance(value, datetime.datetime):
+        value = {'ts': value.replace(tzinfo=None).isoformat()}
+    raw = json.dumps([value, record['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        value, doc_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if isinstance(value, dict) and 'ts' in value:
+        value = datetime.datetime.fromisoformat(value['ts'])
+    return value, doc_id
+
+
+class MemoryDocumentIndex:
+    """Keeps documents in a dict, with the same query semantics as Firestore. Used for tests and local runs."""
+
+    def __init__(self):
+        self._documents = {}
+        self._lock = threading.Lock()
+
+    def write_many(self, records):
+        with self._lock:
+            for record in records:
+                self._documents[record['id']] = dict(record)
+
+    def get(self, doc_id):
+        with self._lock:
+            record = self._documents.get(doc_id)
+            return dict(record) if record else None
+
+    def query(self, query):
+        field, descending = order_for(query)
+        with self._lock:
+            records = [dict(record) for record in self._documents.values()]
+        records = [record for record in records if self._matches(record, query)]
+        # Like Firestore, documents without a value for the ordered field are left out
+        records = [record for record in records if record.get(field) is not None]
+        records.sort(key=lambda record: (_naive(record[field]), record['id']), reverse=descending)
+        if query['cursor'] is not None:
+            after = (_naive(query['cursor'][0]), query['cursor'][1])
+            if descending:
+                records = [record for record in records if (_naive(record[field]), record['id']) < after]
+            else:
+                records = [record for record in records if (_naive(record[field]), record['id']) > after]
+        return records[:query['limit']]
+
+    @staticmethod
+    def _matches(record, query):
+        if any(record.get(key) != value for key, value in query['equals'].items()):
+            return False
+        if query['range'] is not None:
+            field, low, high = query['range']
+            value = record.get(field)
+            if value is None or (low is not None and value < low) or (high is not None and value > high):
+                return False
+        return True
+
+
+def _naive(value):
+    return value.replace(tzinfo=None) if isinstance(value, datetime.datetime) else value
+
+
+class FirestoreDocumentIndex:
+    """
+    Keeps documents in a Firestore collection (or the emulator, with FIRESTORE_EMULATOR_HOST set).
+    `db` is a Firestore client, or a function returning one to defer connecting until first use.
+
+    Filtered listings need composite indexes on (filter fields..., order field, id); Firestore
+    links to the one it is missing in the error for the first such query.
+    """
+
+    def __init__(self, db, collection='documents'):
+        self._db = db
+        self._collection_name = collection
+        self._client = None
+        self._collection = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._db() if callable(self._db) else self._db
+        return self._client
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._collection = self.client.collection(self._collection_name)
+        return self._collection
+
+    def write_many(self, records):
+        for start in range(0, len(records), MAX_BATCH_WRITES):
+            batch = self.client.batch()
+            for record in records[start:start + MAX_BATCH_WRITES]:
+                batch.set(self.collection.document(record['id']), record)
+            batch.commit()
+
+    def get(self, doc_id):
+        snapshot = self.collection.document(doc_id).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    def query(self, query):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        field, descending = order_for(query)
+        direction = 'DESCENDING' if descending else 'ASCENDING'
+        q = self.collection
+        for key, value in query['equals'].items():
+            q = q.where(filter=FieldFilter(key, '==', value))
+        if query['range'] is not None:
+            _, low, high = query['range']
+            if low is not None:
+                q = q.where(filter=FieldFilter(field, '>=', low))
+            if high is not None:
+                q = q.where(filter=FieldFilter(field, '<=', high))
+        q = q.order_by(field, direction=direction).order_by('id', direction=direction)
+        if query['cursor'] is not None:
+            q = q.start_after({field: query['cursor'][0], 'id': query['cursor'][1]})
+        # Listings only need the summary fields, not the extracted blobs
+        q = q.select(SUMMARY_FIELDS + ['address_search']).limit(query['limit'])
+        return [snapshot.to_dict() for snapshot in q.stream()]
+
+
+def create_document_index(kind=None, db=None):
+    """Build the document index selected by DOCUMENT_STORE (memory or firestore)."""
+    kind = kind or os.getenv('DOCUMENT_STORE', 'firestore')
+    if kind == 'memory':
+        return MemoryDocumentIndex()
+    if kind == 'firestore':
+        if db is None:
+            raise ValueError("Firestore document index requires a Firestore client")
+        return FirestoreDocumentIndex(db)
+    raise ValueError(f"Unknown document store: {kind}")
+
+
+class DocumentWriter:
+    """
+    Buffers document writes and commits them to the index in batches from one background thread.
+
+    add() returns a Future that resolves to the document id once its batch is committed. The
+    queue is bounded, so when the index falls behind, add() blocks its caller (up to `timeout`)
+    instead of letting pending documents pile up in memory. Cancelling the future before its
+    batch is taken drops the document.
+    """
+
+    def __init__(self, index, batch_size=DOCUMENT_BATCH_SIZE, flush_interval=DOCUMENT_FLUSH_INTERVAL,
+                 max_pending=DOCUMENT_WRITE_QUEUE):
+        self.index = index
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add(self, record, timeout=None):
+        self._ensure_started()
+        future = Future()
+        try:
+            self._queue.put((record, future), timeout=timeout)
+        except queue.Full:
+            raise RuntimeError(f"Document write queue is full ({self._queue.maxsize} pending)")
+        return future
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _ensure_started(self):
+        # Started on first use so a pre-forking server's master never owns the thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='document-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stopping:
+                return
+
+    def _flush(self, batch):
+        # Documents whose caller gave up waiting and cancelled them are not written
+        batch = [(record, future) for record, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        records = [record for record, _ in batch]
+        try:
+            with timed('firestore.batch_write'):
+                self.index.write_many(records)
+        except Exception as e:
+            logging.error(f"Writing {len(records)} documents failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for record, future in batch:
+            future.set_result(record['id'])
+
+    def stop(self, wait=True):
+        """Commits what is queued and stops the writer thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        if wait:
+            self._thread.join()
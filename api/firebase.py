@@ -0,0 +1,77 @@
+import os
+import json
+import base64
+import threading
+
+from firebase_admin import credentials, initialize_app, firestore, storage
+
+# Firebase is initialized on first use rather than at import: gRPC clients don't survive a
+# fork, so a pre-forking server must create them in each worker, not in the master process
+_firebase_app = None
+_db = None
+_bucket = None
+_lock = threading.Lock()
+
+
+def get_firebase_app():
+    global _firebase_app
+    if _firebase_app is None:
+        with _lock:
+            if _firebase_app is None:
+                _firebase_app = _initialize()
+    return _firebase_app
+
+
+def _initialize():
+    firebase_service_account_key_base64 = os.getenv('NEXT_PUBLIC_FIREBASE_SERVICE_ACCOUNT_KEY')
+    if not firebase_service_account_key_base64:
+        raise ValueError("Missing Firebase service account key environment variable")
+
+    firebase_service_account_key_bytes = base64.b64decode(firebase_service_account_key_base64)
+    firebase_service_account_key_str = firebase_service_account_key_bytes.decode('utf-8')
+
+    try:
+        firebase_service_account_key_dict = json.loads(firebase_service_account_key_str)
+        cred = credentials.Certificate(firebase_service_account_key_dict)
+        return initialize_app(cred, {
+            'databaseURL': 'https://aicre-5b66a-default-rtdb.firebaseio.com/',
+            'storageBucket': 'aicre-5b66a.appspot.com'
+        })
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON Decode Error: {e}")
+    except Exception as e:
+        raise ValueError(f"Firebase Initialization Error: {e}")
+
+
+def get_db():
+    """Firestore client for this process; the local emulator's when FIRESTORE_EMULATOR_HOST is set."""
+    global _db
+    if _db is None:
+        if os.getenv('FIRESTORE_EMULATOR_HOST'):
+            with _lock:
+                if _db is None:
+                    _db = _emulator_client()
+            return _db
+        app = get_firebase_app()
+        with _lock:
+            if _db is None:
+                _db = firestore.client(app)
+    return _db
+
+
+def _emulator_client():
+    # The emulator doesn't check credentials, so no service account key is needed
+    from google.auth.credentials import AnonymousCredentials
+    from google.cloud.firestore import Client
+    return Client(project=os.getenv('FIREBASE_PROJECT_ID', 'aicre-5b66a'), credentials=AnonymousCredentials())
+
+
+def get_bucket():
+    """Firebase Storage bucket for this process."""
+    global _bucket
+    if _bucket is None:
+        app = get_firebase_app()
+        with _lock:
+            if _bucket is None:
+                _bucket = storage.bucket(app=app)
+    return _bucket
@@ -1,122 +1,355 @@
 import os
 import sys
-import base64
 import json
 import requests
-from flask import Flask, jsonify, request, make_response
+from flask import Flask, jsonify, request, make_response, Response, stream_with_context, g
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-from firebase_admin import credentials, initialize_app, firestore, storage
 import openai
 import threading
 import csv
 from io import BytesIO
-import datetime
+import logging
+import uuid
+import time
+import cProfile
 import pandas as pd
+from concurrent.futures import TimeoutError
 
 # Append the correct system path for module imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Import custom scraping logic
-from api.tools.census import get_census_data
-from api.tools.extract_property_data import extract_data_from_pdf
-from api.tools.news import get_national_news, get_regional_news, get_emerging_news
-from api.tools.zillow import scrape_zillow_data
+from api.tools.census import get_census_data, get_census_batch, get_region_figures
+from api.tools.census_store import LEVELS as CENSUS_LEVELS, is_fips
+from api.tools.extract_property_data import extract_property_data, iter_pdf_pages, EXTRACTOR_VERSION
+from api.tools.nlp import preload_nlp, nlp_loaded
+from api.tools.document_analysis import analyze_document, PROMPT_VERSION
+from api.tools.news import NEWS_CATEGORIES, MAX_NEWS_QUERIES, MAX_NEWS_QUERY_LENGTH, get_news_batch
+from api.tools.news_cache import news_cache, NEWS_REFRESH_INTERVAL
+from api.tools.rates_feed import rates_feed, RATES_REFRESH_INTERVAL
+from api.tools.zillow import scrape_zillow_data, zillow_cache_stats
+from api.tools.zillow_batch import scrape_portfolio, parse_address_csv, validate_addresses, Checkpoint, checkpoint_path
+from api.stages import run_stages, stage_pool
+from api.algos.aicre_report import generate_aicre_report
+from api.algos.sreo import score_properties, region_frame
+from api.jobs import create_job_store, JobRunner, JobQueueFull, job_status, new_job, DONE, FAILED
+from api.cache import TTLCache, SQLiteCache, FirestoreCache, TieredCache
+from api.firebase import get_db, get_bucket
+from api.documents import (create_document_index, DocumentWriter, document_record, parse_document_query,
+                           order_for, encode_cursor, public_document, SUMMARY_FIELDS)
+from api.uploads import UploadRequest, Upload, spool_stream, ALLOWED_TYPES, MAX_REQUEST_BYTES
+from api.logconfig import configure_logging
+from api.metrics import timed, render as render_metrics, record_upstream, http_seconds
+from api.tools import http_client
 
+# Log through a background writer thread instead of writing to the file on request threads
+configure_logging()
+http_client.add_metrics_hook(record_upstream)
+
+
+# Load the spaCy model in the master process when running under a pre-forking server
+if os.getenv('PRELOAD_NLP') == '1':
+    preload_nlp()
 
 # Initialize Flask app
 app = Flask(__name__)
+# Uploaded files are streamed into a bounded, hashing in-memory spool rather than saved to /tmp
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
 CORS(app, resources={r"/api/*": {"origins": ["https://getaicre.com", "https://aicre.io", "http://localhost:3000"]}})
 
-# Firebase setup
-firebase_service_account_key_base64 = os.getenv('NEXT_PUBLIC_FIREBASE_SERVICE_ACCOUNT_KEY')
-if not firebase_service_account_key_base64:
-    raise ValueError("Missing Firebase service account key environment variable")
+# Opt-in per-request profiling: with PROFILING_ENABLED=1, a request carrying an X-Profile header
+# (cprofile, or pyinstrument if installed) is profiled and the dump path returned in X-Profile-File.
+# Only the request thread is profiled, not work handed to the stage or job pools.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED') == '1'
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp/aicre_profiles')
 
-firebase_service_account_key_bytes = base64.b64decode(firebase_service_account_key_base64)
-firebase_service_account_key_str = firebase_service_account_key_bytes.decode('utf-8')
+def _start_profiler(mode):
+    if mode == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logging.warning("pyinstrument is not installed; profiling with cProfile instead")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            return 'pyinstrument', profiler
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return 'cprofile', profiler
 
-try:
-    firebase_service_account_key_dict = json.loads(firebase_service_account_key_str)
-    cred = credentials.Certificate(firebase_service_account_key_dict)
-    firebase_app = initialize_app(cred, {
-        'databaseURL': 'https://aicre-5b66a-default-rtdb.firebaseio.com/',
-        'storageBucket': 'aicre-5b66a.appspot.com'
-    })
-    bucket = storage.bucket(app=firebase_app)  # Initialize Firebase Storage bucket
-except json.JSONDecodeError as e:
-    raise ValueError(f"JSON Decode Error: {e}")
-except Exception as e:
-    raise ValueError(f"Firebase Initialization Error: {e}")
+def _save_profile(mode, profiler):
+    # Stopped before anything that can fail, so a profiler never outlives its request
+    if mode == 'pyinstrument':
+        profiler.stop()
+    else:
+        profiler.disable()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'unmatched'}-{uuid.uuid4().hex[:8]}"
+    if mode == 'pyinstrument':
+        path = os.path.join(PROFILE_DIR, f"{name}.html")
+        with open(path, 'w') as f:
+            f.write(profiler.output_html())
+    else:
+        path = os.path.join(PROFILE_DIR, f"{name}.prof")
+        profiler.dump_stats(path)
+    return path
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    profile = request.headers.get('X-Profile')
+    if PROFILING_ENABLED and profile:
+        g.profiler = _start_profiler(profile.strip().lower())
+
+@app.after_request
+def record_request_metrics(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        response.headers['X-Profile-File'] = _save_profile(*profiler)
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_seconds.observe(time.perf_counter() - started, endpoint, request.method, str(response.status_code))
+    return response
 
-# Firestore client setup
-db = firestore.client(firebase_app)
+@app.teardown_request
+def stop_request_profiler(exc):
+    # after_request is skipped when an exception escapes the request (or an earlier after_request
+    # handler); the profiler is still stopped and saved, with the path logged instead of returned
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        try:
+            logging.warning(f"Request failed with {exc!r}; profile saved to {_save_profile(*profiler)}")
+        except Exception as e:
+            logging.error(f"Could not save request profile: {e}")
+
+# Prometheus metrics for this process: request, stage and upstream latencies
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 
 # OpenAI GPT-4 setup
 openai.api_key = os.getenv('NEXT_PUBLIC_OPEN_API_KEY')
 
 def analyze_document_with_gpt4(document_text):
-    """Calls OpenAI GPT-4 to analyze and extract information from a document."""
+    """
+    Calls OpenAI GPT-4 to analyze and extract information from a document, chunked for long documents.
+    Errors are raised, so the gpt stage reports them instead of storing them as the analysis.
+    """
+    return analyze_document(document_text)
+
+# Per-stage deadlines (seconds) for document processing
+STAGE_TIMEOUTS = {
+    'gpt': int(os.getenv('GPT_STAGE_TIMEOUT', '120')),
+    'extract': int(os.getenv('EXTRACT_STAGE_TIMEOUT', '120')),
+    'storage': int(os.getenv('STORAGE_STAGE_TIMEOUT', '60')),
+    'firestore': int(os.getenv('FIRESTORE_STAGE_TIMEOUT', '30')),
+}
+# Room for the three concurrent stages of every document job
+document_stages = stage_pool('document', 3 * int(os.getenv('JOB_WORKERS', '4')))
+
+# Storage uploads are resumable, sent in chunks of this size (a multiple of 256 KiB)
+STORAGE_CHUNK_BYTES = int(os.getenv('STORAGE_CHUNK_BYTES', str(8 * 1024 * 1024)))
+
+def upload_to_storage(upload, data):
+    """Stores the upload's bytes in Firebase Storage under its content hash and returns their public URL."""
+    with timed('storage.upload'):
+        # Keyed by hash so uploads sharing a filename don't overwrite each other
+        blob = get_bucket().blob(f"documents/{upload.sha256}/{upload.filename}", chunk_size=STORAGE_CHUNK_BYTES)
+        blob.upload_from_file(BytesIO(data), size=upload.size, content_type=upload.content_type)
+    return blob.public_url
+
+def document_pages(upload, data):
+    """Page texts of a PDF upload, parsed from memory; a text upload is a single page."""
+    if upload.is_pdf:
+        with timed('pdf.read'):
+            return list(iter_pdf_pages(data))
+    return [data.decode('utf-8', errors='replace')]
+
+# Content-addressed cache of document analysis results: local LRU in front of Firestore (or SQLite)
+DOCUMENT_CACHE_TTL = int(os.getenv('DOCUMENT_CACHE_TTL', str(30 * 24 * 3600)))
+
+if os.getenv('DOCUMENT_CACHE', 'firestore') == 'sqlite':
+    document_cache_store = SQLiteCache(os.getenv('DOCUMENT_CACHE_PATH', '/tmp/aicre_documents.sqlite3'), DOCUMENT_CACHE_TTL)
+else:
+    document_cache_store = FirestoreCache(get_db, 'document_cache', DOCUMENT_CACHE_TTL)
+
+document_cache = TieredCache(TTLCache(maxsize=256, ttl=DOCUMENT_CACHE_TTL), document_cache_store)
+
+# Processed documents, searchable through /api/documents; writes are buffered and batched
+document_index = create_document_index(db=get_db)
+document_writer = DocumentWriter(document_index)
+
+def document_cache_key(sha256):
+    """SHA-256 of the file bytes, versioned by extractor and prompt version."""
+    return f"{sha256}-x{EXTRACTOR_VERSION}-p{PROMPT_VERSION}"
+
+def process_document(upload, cache_key=None):
+    """Runs GPT-4 analysis, property extraction, Firestore and Storage writes for an uploaded file."""
+    # The spool is read once, when the job runs; parsing and the Storage upload share the bytes
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an AI that extracts relevant data from commercial real estate documents."},
-                {"role": "user", "content": f"Extract all important data from this document:\n{document_text}"}
-            ],
-            max_tokens=1500
-        )
-        return response['choices'][0]['message']['content']
-    except Exception as e:
-        return str(e)
-
-# Consolidated route for uploading and processing documents with GPT-4 and extracting property data
-@app.route('/api/upload', methods=['POST'])
-def upload_file():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part'}), 400
+        data = upload.read()
+    finally:
+        upload.close()
+    # The document is parsed once; GPT-4 and the extractor share its text
+    pages = document_pages(upload, data)
+
+    # GPT-4 analysis, property extraction and the Storage upload don't depend on each other;
+    # pages are joined with form feeds so the GPT chunker can split on page boundaries
+    results, errors = run_stages({
+        'gpt': lambda: analyze_document_with_gpt4('\f'.join(pages)),
+        'extract': lambda: extract_property_data(pages),
+        'storage': lambda: upload_to_storage(upload, data),
+    }, STAGE_TIMEOUTS, pool=document_stages)
+
+    if not results:
+        raise RuntimeError(f"Document processing failed: {errors}")
+
+    gpt_extracted_info = results.get('gpt')
+    property_extracted_info = results.get('extract')
+    file_url = results.get('storage')
+
+    # Store whatever was extracted; the writer commits documents from concurrent jobs in shared batches
+    document_id = None
+    if 'gpt' in results or 'extract' in results:
+        record = document_record(upload, gpt_extracted_info, property_extracted_info)
+        timeout = STAGE_TIMEOUTS['firestore']
+        write = None
+        try:
+            with timed('firestore.write'):
+                write = document_writer.add(record, timeout=timeout)
+                document_id = write.result(timeout=timeout)
+        except TimeoutError:
+            logging.error(f"Stage firestore timed out after {timeout}s")
+            if write.cancel():
+                # Still queued: dropped, so the failed job doesn't leave a document behind
+                errors['firestore'] = f"Timed out after {timeout}s"
+            else:
+                # Its batch is already being committed; the document will most likely appear
+                document_id = record['id']
+                errors['firestore'] = f"Pending: still writing after {timeout}s"
+        except Exception as e:
+            logging.error(f"Stage firestore failed: {e}")
+            errors['firestore'] = str(e)
+
+    result = {
+        'document_id': document_id,
+        'gpt_details': gpt_extracted_info,
+        'property_details': property_extracted_info,
+        'file_url': file_url,
+        'errors': errors
+    }
+
+    # Only complete analyses are reused for later uploads of the same file
+    if cache_key and 'gpt' in results and not errors:
+        document_cache.set(cache_key, result)
+
+    return result
+
+# Background job runner for document processing
+job_store = create_job_store(db=get_db)
+job_runner = JobRunner(job_store)
 
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({'error': e.description}), 413
 
-    if file:
-        # Save the uploaded file
+# Consolidated route for uploading documents; processing runs as a background job.
+# Accepts a multipart `file` part, or the raw file as the request body with ?filename=
+@app.route('/api/upload', methods=['POST'])
+def upload_file():
+    if request.mimetype == 'multipart/form-data':
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file part'}), 400
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No selected file'}), 400
         filename = secure_filename(file.filename)
-        file_path = os.path.join('/tmp', filename)
-        file.save(file_path)
+        spool = file.stream
+    else:
+        filename = secure_filename(request.args.get('filename', ''))
+        if not filename:
+            return jsonify({'error': 'Missing filename'}), 400
+        spool = spool_stream(request.stream)
 
-        # Assuming text-based files (CSV, JSON, or plain text) for GPT-4 analysis
-        with open(file_path, 'r') as f:
-            document_text = f.read()
+    if not filename:
+        return jsonify({'error': 'Invalid filename'}), 400
 
-        # Call GPT-4 for document analysis
-        gpt_extracted_info = analyze_document_with_gpt4(document_text)
+    # The body was hashed while it streamed in; it stays spooled until the job reads it
+    upload = Upload.from_spool(filename, spool)
+    if upload.size == 0:
+        upload.close()
+        return jsonify({'error': 'Empty file'}), 400
+    if upload.content_type not in ALLOWED_TYPES:
+        upload.close()
+        return jsonify({'error': f"Unsupported file type: {upload.content_type}"}), 415
 
-        # Call the extraction function for property data
-        property_extracted_info = extract_data_from_pdf(file_path)
+    # Same bytes analyzed before: answer from the cache without recomputing or re-uploading
+    with timed('document_cache.lookup'):
+        cache_key = document_cache_key(upload.sha256)
+        cached = document_cache.get(cache_key)
+    if cached is not None:
+        upload.close()
+        job = new_job('document', {'filename': filename, 'cache_key': cache_key})
+        job.update(status=DONE, result=cached)
+        job_store.create(job)
+        return jsonify({**job_status(job), 'cached': True, 'result': cached}), 200
+
+    # Queue GPT-4 analysis, extraction and storage; the client polls /api/jobs/<id>
+    try:
+        job = job_runner.submit('document', process_document, upload, cache_key,
+                                payload={'filename': filename, 'cache_key': cache_key,
+                                         'content_type': upload.content_type, 'size': upload.size})
+    except JobQueueFull as e:
+        upload.close()
+        return jsonify({'error': f"{e}; retry later"}), 503, {'Retry-After': '30'}
+    return jsonify(job_status(job)), 202
 
-        # Store the extracted info in Firebase Firestore
-        doc_ref = db.collection('documents').add({
-            'filename': filename,
-            'gpt_extracted_info': gpt_extracted_info,
-            'property_extracted_info': json.loads(property_extracted_info),
-            'timestamp': datetime.datetime.utcnow()
-        })
+# Endpoint for job status
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_store.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_status(job))
 
-        # Store the file in Firebase Storage
-        blob = bucket.blob(f"documents/{filename}")
-        blob.upload_from_filename(file_path)
-        file_url = blob.public_url
+# Endpoint for job result
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_store.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] == FAILED:
+        return jsonify({'error': job['error']}), 500
+    if job['status'] != DONE:
+        return jsonify(job_status(job)), 202
+    return jsonify(job['result']), 200
 
-        # Return extracted info and file URL
-        return jsonify({
-            'gpt_details': gpt_extracted_info,
-            'property_details': json.loads(property_extracted_info),
-            'file_url': file_url
-        }), 200
+# Processed documents, newest first, or ordered by the field a range filter applies to.
+# Pages are cursor-based: pass the response's next_cursor to get the following page
+@app.route('/api/documents', methods=['GET'])
+def list_documents():
+    try:
+        query = parse_document_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    records = document_index.query(query)
+    next_cursor = None
+    if len(records) == query['limit']:
+        next_cursor = encode_cursor(records[-1], order_for(query)[0])
+    return jsonify({
+        'documents': [public_document(record, SUMMARY_FIELDS) for record in records],
+        'next_cursor': next_cursor,
+    })
 
-    return jsonify({'error': 'File processing failed'}), 500
+@app.route('/api/documents/<document_id>', methods=['GET'])
+def get_document(document_id):
+    record = document_index.get(document_id)
+    if not record:
+        return jsonify({'error': 'Document not found'}), 404
+    return jsonify(public_document(record))
 
 # Endpoint for Zillow Data
 @app.route('/api/zillow', methods=['GET'])
@@ -124,35 +357,297 @@ def zillow_data():
     user_input = request.args.get('address')
     if not user_input:
         return jsonify({'error': 'Address is required'}), 400
+    return jsonify(scrape_zillow_data(user_input))
+
+# Endpoint for scraping a portfolio of addresses; results stream back as NDJSON as they complete
+@app.route('/api/zillow/batch', methods=['POST'])
+def zillow_batch():
+    if 'file' in request.files:
+        try:
+            addresses = parse_address_csv(request.files['file'].read().decode('utf-8-sig'))
+        except (UnicodeDecodeError, csv.Error) as e:
+            return jsonify({'error': f"Could not read the CSV file: {e}"}), 400
+        checkpoint_id = request.form.get('checkpoint')
+    else:
+        body = request.get_json(silent=True) or {}
+        if not isinstance(body, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        addresses = body.get('addresses', [])
+        checkpoint_id = body.get('checkpoint')
+
+    if not addresses:
+        return jsonify({'error': 'Addresses are required (JSON "addresses" list or CSV file)'}), 400
+    # Checked before streaming starts, so a bad batch gets a 400 rather than a broken stream
+    try:
+        validate_addresses(addresses)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not isinstance(checkpoint_id, (str, type(None))):
+        return jsonify({'error': 'checkpoint must be a string'}), 400
+
+    # Re-sending the same checkpoint id resumes an interrupted run
+    checkpoint_id = secure_filename(checkpoint_id or '') or uuid.uuid4().hex
+    checkpoint = Checkpoint(checkpoint_path(checkpoint_id))
+
+    def generate():
+        for item in scrape_portfolio(addresses, checkpoint):
+            yield json.dumps(item) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Checkpoint-Id': checkpoint_id})
+
+# Endpoint for Zillow scrape cache counters
+@app.route('/api/zillow/cache', methods=['GET'])
+def zillow_cache():
+    return jsonify(zillow_cache_stats())
 
 
-# Route for getting Census data
-@app.route('/census', methods=['GET'])
+# Route for getting Census data. A single `region` returns rows as before; `regions` (comma-separated,
+# or a JSON list when POSTed) returns columns, or a CSV/Parquet download with format=csv|parquet
+@app.route('/census', methods=['GET', 'POST'])
 def census_data():
-    region = request.args.get('region')
-    if not region:
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        if not isinstance(body, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        regions = body.get('regions', [])
+        variables = body.get('variables')
+        level = body.get('level', 'state')
+        output = body.get('format', 'json')
+    else:
+        region = request.args.get('region')
+        if region and 'regions' not in request.args:
+            data = get_census_data(region)
+            return jsonify(data)
+        regions = [r for r in request.args.get('regions', '').split(',') if r]
+        variables = [v for v in request.args.get('variables', '').split(',') if v] or None
+        level = request.args.get('level', 'state')
+        output = request.args.get('format', 'json')
+
+    if not regions:
         return jsonify({'error': 'Region is required'}), 400
-    data = get_census_data(region)
-    return jsonify(data)
+    if not _is_string_list(regions):
+        return jsonify({'error': 'regions must be a list of FIPS code strings'}), 400
+    if variables is not None and not _is_string_list(variables):
+        return jsonify({'error': 'variables must be a list of strings'}), 400
+    if level not in CENSUS_LEVELS:
+        return jsonify({'error': f"Level must be one of: {', '.join(CENSUS_LEVELS)}"}), 400
+
+    columns, errors = get_census_batch(regions, variables, level)
+    if output == 'json':
+        return jsonify({'level': level, 'count': len(columns['fips']), 'data': columns, 'errors': errors})
+
+    frame = pd.DataFrame(columns)
+    if output == 'csv':
+        return Response(frame.to_csv(index=False), mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename=census_{level}.csv'})
+    if output == 'parquet':
+        try:
+            body = frame.to_parquet(index=False)
+        except ImportError:
+            return jsonify({'error': 'Parquet output needs pyarrow installed on the server'}), 400
+        return Response(body, mimetype='application/vnd.apache.parquet',
+                        headers={'Content-Disposition': f'attachment; filename=census_{level}.parquet'})
+    return jsonify({'error': 'Format must be json, csv or parquet'}), 400
+
+# Route for the AiCRE report of a property; sources are fetched in parallel
+@app.route('/api/report', methods=['GET'])
+def aicre_report():
+    address = request.args.get('address')
+    region = request.args.get('region')
+    if not address or not region:
+        return jsonify({'error': 'Address and region are required'}), 400
+    try:
+        deadline = float(request.args['deadline']) if 'deadline' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'Deadline must be a number of seconds'}), 400
+    return jsonify(generate_aicre_report(address, region, deadline=deadline))
+
+# Route for scoring many properties at once; returns them ranked by SREO index
+@app.route('/api/report/batch', methods=['POST'])
+def aicre_report_batch():
+    if 'properties' in request.files:
+        try:
+            properties = pd.read_csv(request.files['properties'], dtype={'region': str})
+            regions = pd.read_csv(request.files['regions'], dtype={'region': str}) if 'regions' in request.files else None
+        except (pd.errors.ParserError, UnicodeDecodeError, ValueError) as e:
+            return jsonify({'error': f"Could not read the CSV file: {e}"}), 400
+        limit = request.form.get('limit')
+        level = request.form.get('level', 'state')
+    else:
+        body = request.get_json(silent=True) or {}
+        if not isinstance(body, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        rows = body.get('properties', [])
+        region_rows = body.get('regions')
+        if not _is_object_list(rows) or (region_rows is not None and not _is_object_list(region_rows)):
+            return jsonify({'error': 'properties and regions must be lists of objects'}), 400
+        try:
+            properties = pd.DataFrame(rows)
+            regions = pd.DataFrame(region_rows) if region_rows else None
+        except ValueError as e:
+            return jsonify({'error': f"Invalid properties or regions: {e}"}), 400
+        limit = body.get('limit')
+        level = body.get('level', 'state')
+
+    if properties.empty or 'region' not in properties:
+        return jsonify({'error': 'Properties with a region column are required'}), 400
+    if limit is not None and limit != '':
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'limit must be an integer'}), 400
+        if limit < 1:
+            return jsonify({'error': 'limit must be at least 1'}), 400
+
+    # Without region figures in the request, fetch housing stock and population growth from census
+    # in one batch; census has no GDP, so GDP growth counts as 0 unless regions are supplied.
+    # Region keys are then FIPS codes of `level` (state by default)
+    region_errors = {}
+    if regions is None:
+        if level not in CENSUS_LEVELS:
+            return jsonify({'error': f"Level must be one of: {', '.join(CENSUS_LEVELS)}"}), 400
+        region_keys = properties['region'].astype(str).unique().tolist()
+        invalid = [key for key in region_keys if not is_fips(key, level)]
+        if invalid:
+            return jsonify({'error': f"Not {level} FIPS codes: {', '.join(invalid[:10])}"}), 400
+        region_data, region_errors = get_region_figures(region_keys, level=level)
+        regions = region_frame(region_data)
+
+    scored = score_properties(properties, regions)
+    if limit:
+        scored = scored.head(limit)
+
+    # to_json writes NaN as null and is much faster than jsonify on large frames
+    body = (f'{{"count": {len(scored)}, "region_errors": {json.dumps(region_errors)}, '
+            f'"results": {scored.to_json(orient="records")}}}')
+    return Response(body, mimetype='application/json')
 
 # Endpoint for National News
 @app.route('/api/news/national', methods=['GET'])
 def national_news():
-    news_data = get_national_news()
+    news_data = news_cache.get('national')
     return jsonify(news_data)
 
 # Endpoint for Regional News
 @app.route('/api/news/regional', methods=['GET'])
 def regional_news():
-    news_data = get_regional_news()
+    news_data = news_cache.get('regional')
     return jsonify(news_data)
 
 # Endpoint for Emerging News
 @app.route('/api/news/emerging', methods=['GET'])
 def emerging_news():
-    news_data = get_emerging_news()
+    news_data = news_cache.get('emerging')
     return jsonify(news_data)
 
-# Main entry point for running the Flask app on the specified port and host
+def _is_string_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+def _is_object_list(value):
+    return isinstance(value, list) and all(isinstance(item, dict) for item in value)
+
+# Endpoint for several news categories and custom queries in one request
+@app.route('/api/news', methods=['GET', 'POST'])
+def combined_news():
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        if not isinstance(body, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        categories = body.get('categories', [])
+        queries = body.get('queries', [])
+        deadline = body.get('deadline')
+    else:
+        categories = [c for c in request.args.get('categories', '').split(',') if c]
+        queries = request.args.getlist('q')
+        deadline = request.args.get('deadline')
+
+    if not _is_string_list(categories) or not _is_string_list(queries):
+        return jsonify({'error': 'categories and queries must be lists of strings'}), 400
+    if len(queries) > MAX_NEWS_QUERIES:
+        return jsonify({'error': f"At most {MAX_NEWS_QUERIES} queries per request"}), 400
+    queries = [q.strip() for q in queries if q.strip()]
+    if any(len(q) > MAX_NEWS_QUERY_LENGTH for q in queries):
+        return jsonify({'error': f"Queries are limited to {MAX_NEWS_QUERY_LENGTH} characters"}), 400
+    unknown = [c for c in categories if c not in NEWS_CATEGORIES]
+    if unknown:
+        return jsonify({'error': f"Unknown news categories: {', '.join(unknown)}"}), 400
+    if not categories and not queries:
+        categories = list(NEWS_CATEGORIES)
+
+    try:
+        deadline = float(deadline) if deadline is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Deadline must be a number of seconds'}), 400
+
+    news_data = get_news_batch(categories, queries, deadline, fetch_category=news_cache.get)
+    return jsonify(news_data)
+
+# Endpoint for the current interest rates
+@app.route('/api/interest-rates', methods=['GET'])
+def interest_rates():
+    return jsonify(rates_feed.get())
+
+# Endpoint for recorded interest rates, optionally for one source and between epoch timestamps
+@app.route('/api/interest-rates/history', methods=['GET'])
+def interest_rate_history():
+    try:
+        since = float(request.args['since']) if 'since' in request.args else None
+        until = float(request.args['until']) if 'until' in request.args else None
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'since and until must be epoch seconds and limit an integer'}), 400
+    history = rates_feed.history(request.args.get('source'), since, until, limit)
+    return jsonify({'count': len(history), 'observations': history})
+
+# News and interest rates are refreshed in the background and served from memory. Threads don't
+# survive a fork, so under gunicorn (DEFER_BACKGROUND_TASKS=1) each worker starts them after forking
+_background_started = False
+_shutting_down = False
+
+def start_background_tasks():
+    global _background_started
+    news_cache.start_refresher(NEWS_REFRESH_INTERVAL)
+    rates_feed.start_refresher(RATES_REFRESH_INTERVAL)
+    _background_started = True
+
+def stop_background_tasks(wait=True):
+    """Stops the refreshers and waits for queued document jobs, so a worker can exit cleanly."""
+    global _shutting_down
+    _shutting_down = True
+    news_cache.stop_refresher()
+    rates_feed.stop_refresher()
+    job_runner.shutdown(wait=wait)
+    # After the jobs, so the documents they queued are committed
+    document_writer.stop(wait=wait)
+
+if os.getenv('DEFER_BACKGROUND_TASKS') != '1':
+    start_background_tasks()
+
+# Liveness: the process is up and serving requests
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({'status': 'ok'})
+
+# Readiness: shared resources are loaded and the worker isn't shutting down
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    checks = {
+        'background_tasks': _background_started,
+        'accepting_requests': not _shutting_down,
+    }
+    if os.getenv('PRELOAD_NLP') == '1':
+        checks['nlp'] = nlp_loaded()
+    if os.getenv('READYZ_CHECK_FIREBASE', '1') == '1':
+        try:
+            get_db()
+            checks['firebase'] = True
+        except ValueError as e:
+            logging.error(f"Readiness check failed: {e}")
+            checks['firebase'] = False
+    ready = all(checks.values())
+    return jsonify({'status': 'ready' if ready else 'not ready', 'checks': checks}), 200 if ready else 503
+
+# Main entry point for running the Flask development server; production runs api.wsgi under gunicorn
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5328)
+    app.run(debug=os.getenv('FLASK_DEBUG') == '1', host='0.0.0.0', port=int(os.getenv('PORT', '5328')))
@@ -0,0 +1,366 @@
+"""
+Bulk ingestion of document archives (rent rolls, OMs) without going through /api/upload.
+
+    python -m api.ingest /archive/rent_rolls --output rent_rolls.jsonl
+    python -m api.ingest manifest.txt --output oms.parquet --workers 8 --gpt --firestore
+
+The input is a directory (walked for .pdf, .txt, .csv and .json files) or a manifest: a text
+file with one path per line, or a CSV with a 'path' column. Relative manifest paths are
+resolved against the manifest's directory.
+
+Files are extracted on a process pool, each worker loading its own spaCy model (SPACY_MODEL) once. Results
+are written as JSON Lines, or as Parquet part files in the --output directory (needs pyarrow).
+Finished files are recorded in <output>.checkpoint.jsonl after their results are written, so
+rerunning the same command resumes where an interrupted run stopped. A file whose results
+were written just before the interruption can appear twice in JSON Lines output.
+
+GPT-4 analysis (--gpt) and Firestore writes (--firestore) are off by default, so the tool
+runs fully offline. Progress (docs/sec, pages/sec) is printed to stderr as it goes, followed
+by a summary of per-stage timings.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+import importlib.util
+import multiprocessing
+from collections import namedtuple
+
+import pandas as pd
+
+from api.documents import denormalize
+from api.stages import run_stages, stage_pool
+from api.tools.extract_property_data import extract_property_data, iter_pdf_pages
+from api.tools.nlp import get_nlp
+from api.uploads import sniff_content_type, ALLOWED_TYPES, PDF
+
+INGEST_EXTENSIONS = ('.pdf', '.txt', '.csv', '.json')
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', str(os.cpu_count() or 1)))
+# Rows per Parquet part file
+PARQUET_PART_ROWS = int(os.getenv('INGEST_PARQUET_PART_ROWS', '1000'))
+GPT_STAGE_TIMEOUT = int(os.getenv('GPT_STAGE_TIMEOUT', '120'))
+# Columns holding nested data, stored as JSON strings in Parquet
+NESTED_COLUMNS = ['property_extracted_info', 'gpt_extracted_info', 'errors', 'timings']
+
+# What a Firestore document needs to know about the file it came from
+IngestedFile = namedtuple('IngestedFile', 'filename sha256 content_type size')
+
+
+def iter_input_files(source):
+    """Paths of the documents under a directory, or listed in a manifest file."""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(INGEST_EXTENSIONS):
+                    yield os.path.join(root, name)
+        return
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, newline='') as f:
+        rows = [row for row in csv.reader(f) if row and row[0].strip()]
+    if rows and 'path' in [cell.strip().lower() for cell in rows[0]]:
+        column = [cell.strip().lower() for cell in rows[0]].index('path')
+        paths = [row[column].strip() for row in rows[1:] if len(row) > column and row[column].strip()]
+    else:
+        paths = [row[0].strip() for row in rows]
+    for path in paths:
+        yield os.path.join(base, path)
+
+
+class IngestCheckpoint:
+    """JSON Lines file of input paths whose results have been written."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        self.done.add(json.loads(line)['path'])
+                    except (ValueError, KeyError):
+                        continue  # Partially written last line of an interrupted run
+
+    def record(self, path):
+        with self._lock, open(self.path, 'a') as f:
+            f.write(json.dumps({'path': path}) + '\n')
+            self.done.add(path)
+
+
+class JsonlOutput:
+    """Appends one JSON object per document; each row is durable once write() returns."""
+
+    def __init__(self, path):
+        self._file = open(path, 'a')
+
+    def write(self, row):
+        """Writes a row and returns the input paths now safely written."""
+        self._file.write(json.dumps(row, default=str) + '\n')
+        self._file.flush()
+        return [row['path']]
+
+    def close(self):
+        self._file.close()
+        return []
+
+
+class ParquetOutput:
+    """Buffers rows and writes them as numbered Parquet part files in a directory."""
+
+    def __init__(self, directory, part_rows=PARQUET_PART_ROWS):
+        self.directory = directory
+        self.part_rows = part_rows
+        self._rows = []
+        os.makedirs(directory, exist_ok=True)
+        # Continue numbering after the parts of earlier runs
+        self._part = len([name for name in os.listdir(directory) if name.endswith('.parquet')])
+
+    def write(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self.part_rows:
+            return self._flush()
+        return []
+
+    def _flush(self):
+        if not self._rows:
+            return []
+        frame = pd.DataFrame(self._rows)
+        for column in NESTED_COLUMNS:
+            if column in frame:
+                frame[column] = frame[column].map(lambda value: json.dumps(value, default=str))
+        path = os.path.join(self.directory, f"part-{self._part:05d}.parquet")
+        frame.to_parquet(path + '.tmp', index=False)
+        # Renamed into place so a reader never sees a half-written part
+        os.replace(path + '.tmp', path)
+        self._part += 1
+        written = [row['path'] for row in self._rows]
+        self._rows = []
+        return written
+
+    def close(self):
+        return self._flush()
+
+
+_gpt_enabled = False
+# Each worker process runs one file at a time: its extraction and GPT stages side by side
+ingest_stages = stage_pool('ingest', 2)
+
+
+def _init_worker(gpt):
+    global _gpt_enabled
+    _gpt_enabled = gpt
+    if gpt:
+        import openai
+        openai.api_key = os.getenv('NEXT_PUBLIC_OPEN_API_KEY')
+    try:
+        get_nlp()
+    except Exception as e:
+        # Raising here would make the pool restart workers forever; each file reports it instead
+        logging.error(f"Loading the spaCy model failed: {e}")
+
+
+def _timed_call(timings, stage, fn):
+    started = time.perf_counter()
+    try:
+        return fn()
+    finally:
+        timings[stage] = time.perf_counter() - started
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def ingest_file(path):
+    """Worker: reads, parses and extracts one file. Returns its result row, or one with an 'error'."""
+    timings = {}
+    try:
+        data = _timed_call(timings, 'read', lambda: _read_file(path))
+        content_type = sniff_content_type(data[:4096], path)
+        if content_type not in ALLOWED_TYPES:
+            return {'path': path, 'error': f"Unsupported file type: {content_type}", 'timings': timings}
+
+        if content_type == PDF:
+            pages = _timed_call(timings, 'parse', lambda: list(iter_pdf_pages(data)))
+        else:
+            pages = [data.decode('utf-8', errors='replace')]
+
+        stages = {'extract': lambda: _timed_call(timings, 'extract', lambda: extract_property_data(pages))}
+        if _gpt_enabled:
+            from api.tools.document_analysis import analyze_document
+            stages['gpt'] = lambda: _timed_call(timings, 'gpt', lambda: analyze_document(''.join(pages)))
+            results, errors = run_stages(stages, {'gpt': GPT_STAGE_TIMEOUT}, pool=ingest_stages)
+        else:
+            results, errors = {'extract': stages['extract']()}, {}
+        if 'extract' not in results:
+            return {'path': path, 'error': errors.get('extract'), 'timings': timings}
+    except Exception as e:
+        return {'path': path, 'error': str(e), 'timings': timings}
+
+    property_extracted_info = results['extract']
+    summary = denormalize(property_extracted_info)
+    summary.pop('address_search')
+    return {
+        'path': path,
+        'filename': os.path.basename(path),
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'content_type': content_type,
+        'size': len(data),
+        'pages': len(pages),
+        **summary,
+        'property_extracted_info': property_extracted_info,
+        'gpt_extracted_info': results.get('gpt'),
+        'errors': errors,
+        'timings': timings,
+    }
+
+
+class IngestStats:
+    """Counts and per-stage timings of a run, for progress lines and the final summary."""
+
+    def __init__(self, total, skipped):
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.failed = 0
+        self.pages = 0
+        self.timings = {}
+        self.started = time.perf_counter()
+        # Firestore write failures are counted from the document writer's thread
+        self._lock = threading.Lock()
+
+    def add(self, row):
+        for stage, seconds in row.get('timings', {}).items():
+            self.timings.setdefault(stage, []).append(seconds)
+        with self._lock:
+            if 'error' in row:
+                self.failed += 1
+            else:
+                self.done += 1
+                self.pages += row['pages']
+
+    def store_failed(self, pages):
+        """Moves a document that was extracted, but whose Firestore write failed, to the failures."""
+        with self._lock:
+            self.done -= 1
+            self.pages -= pages
+            self.failed += 1
+
+    def progress(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (f"{self.done + self.failed}/{self.total} docs, {self.failed} failed, "
+                f"{self.done / elapsed:.1f} docs/s, {self.pages / elapsed:.1f} pages/s")
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        lines = [f"Ingested {self.done} documents ({self.pages} pages) in {elapsed:.1f}s; "
+                 f"{self.failed} failed, {self.skipped} already done",
+                 self.progress(),
+                 "Per-document stage time, summed across workers:",
+                 f"  {'stage':<10} {'docs':>7} {'total (s)':>10} {'mean (ms)':>10} {'p95 (ms)':>10}"]
+        for stage, values in self.timings.items():
+            ordered = sorted(values)
+            p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+            lines.append(f"  {stage:<10} {len(values):>7} {sum(values):>10.1f} "
+                         f"{sum(values) / len(values) * 1000:>10.1f} {p95 * 1000:>10.1f}")
+        return '\n'.join(lines)
+
+
+def run_ingest(paths, output, checkpoint, workers=INGEST_WORKERS, gpt=False, document_writer=None,
+               progress_interval=10.0, chunksize=4):
+    """
+    Extracts `paths` on a process pool and writes each result to `output`.
+    Paths already in the checkpoint are skipped; a path is checkpointed once its row is written
+    (and, with a document_writer, once its Firestore write has committed). Returns the IngestStats.
+    """
+    pending = [path for path in paths if path not in checkpoint.done]
+    stats = IngestStats(len(pending), len(paths) - len(pending))
+    writes = {}
+
+    def record_when_stored(path, pages):
+        def callback(future):
+            error = future.exception()
+            if error is None:
+                checkpoint.record(path)
+            else:
+                # Not checkpointed, so a resumed run tries it again
+                logging.error(f"Storing {path} in Firestore failed: {error}")
+                stats.store_failed(pages)
+        return callback
+
+    def durable(written):
+        for path in written:
+            write = writes.pop(path, None)
+            if write is None:
+                checkpoint.record(path)
+            else:
+                future, pages = write
+                future.add_done_callback(record_when_stored(path, pages))
+
+    last_progress = time.monotonic()
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(gpt,)) as pool:
+        for row in pool.imap_unordered(ingest_file, pending, chunksize=chunksize):
+            stats.add(row)
+            if 'error' in row:
+                # Failures aren't checkpointed, so a resumed run tries them again
+                logging.error(f"Ingesting {row['path']} failed: {row['error']}")
+            else:
+                if document_writer is not None:
+                    from api.documents import document_record
+                    source = IngestedFile(row['filename'], row['sha256'], row['content_type'], row['size'])
+                    writes[row['path']] = (document_writer.add(
+                        document_record(source, row['gpt_extracted_info'], row['property_extracted_info'])),
+                        row['pages'])
+                durable(output.write(row))
+            if time.monotonic() - last_progress >= progress_interval:
+                print(stats.progress(), file=sys.stderr)
+                last_progress = time.monotonic()
+    durable(output.close())
+    if document_writer is not None:
+        document_writer.stop()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help='directory of documents, or a manifest of paths')
+    parser.add_argument('--output', required=True, help='.jsonl file, or a directory for Parquet parts')
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], help='default: from the --output extension')
+    parser.add_argument('--workers', type=int, default=INGEST_WORKERS)
+    parser.add_argument('--gpt', action='store_true', help='also run GPT-4 analysis (needs the OpenAI key)')
+    parser.add_argument('--firestore', action='store_true', help='also store documents in Firestore')
+    parser.add_argument('--progress', type=float, default=10.0, help='seconds between progress lines')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    output_format = args.format or ('parquet' if args.output.endswith('.parquet') else 'jsonl')
+    if output_format == 'parquet':
+        if not (importlib.util.find_spec('pyarrow') or importlib.util.find_spec('fastparquet')):
+            raise SystemExit("Parquet output needs pyarrow (or fastparquet) installed")
+        output = ParquetOutput(args.output)
+    else:
+        output = JsonlOutput(args.output)
+
+    document_writer = None
+    if args.firestore:
+        from api.documents import DocumentWriter, create_document_index
+        from api.firebase import get_db
+        document_writer = DocumentWriter(create_document_index('firestore', db=get_db))
+
+    paths = list(iter_input_files(args.source))
+    checkpoint = IngestCheckpoint(args.output.rstrip('/') + '.checkpoint.jsonl')
+    stats = run_ingest(paths, output, checkpoint, args.workers, args.gpt, document_writer,
+                       args.progress)
+    print(stats.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+import os
+import json
+import uuid
+import sqlite3
+import logging
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Job states
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def _now():
+    return datetime.datetime.utcnow()
+
+
+def new_job(kind, payload=None):
+    """Build a fresh job record."""
+    return {
+        'id': uuid.uuid4().hex,
+        'kind': kind,
+        'status': PENDING,
+        'payload': payload or {},
+        'result': None,
+        'error': None,
+        'created_at': _now(),
+        'updated_at': _now(),
+    }
+
+
+def job_status(job):
+    """Return the public status view of a job (everything except the result)."""
+    return {
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'error': job['error'],
+        'created_at': job['created_at'].isoformat() + 'Z',
+        'updated_at': job['updated_at'].isoformat() + 'Z',
+    }
+
+
+class MemoryJobStore:
+    """Keeps jobs in a dict. Only visible to the current process."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id, **fields):
+        fields['updated_at'] = _now()
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+
+class SQLiteJobStore:
+    """Keeps jobs in a local SQLite file so several workers on one host can share them."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' id TEXT PRIMARY KEY, kind TEXT, status TEXT, payload TEXT,'
+                ' result TEXT, error TEXT, created_at TEXT, updated_at TEXT)'
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _row_to_job(self, row):
+        job_id, kind, status, payload, result, error, created_at, updated_at = row
+        return {
+            'id': job_id,
+            'kind': kind,
+            'status': status,
+            'payload': json.loads(payload) if payload else {},
+            'result': json.loads(result) if result else None,
+            'error': error,
+            'created_at': datetime.datetime.fromisoformat(created_at),
+            'updated_at': datetime.datetime.fromisoformat(updated_at),
+        }
+
+    def create(self, job):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job['id'], job['kind'], job['status'], json.dumps(job['payload']),
+                 json.dumps(job['result']) if job['result'] is not None else None,
+                 job['error'], job['created_at'].isoformat(), job['updated_at'].isoformat())
+            )
+        return job
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT id, kind, status, payload, result, error, created_at, updated_at'
+                ' FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def update(self, job_id, **fields):
+        fields['updated_at'] = _now().isoformat()
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result']) if fields['result'] is not None else None
+        if 'payload' in fields:
+            fields['payload'] = json.dumps(fields['payload'])
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+
+class FirestoreJobStore:
+    """
+    Keeps jobs in a Firestore collection so every instance sees the same state.
+    `db` is a Firestore client, or a function returning one to defer connecting until first use.
+    Results are stored as JSON strings, like FirestoreCache values, since Firestore rejects
+    nested lists and other shapes analysis results can take.
+    """
+
+    def __init__(self, db, collection='jobs'):
+        self._db = db
+        self._collection_name = collection
+        self._collection = None
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            db = self._db() if callable(self._db) else self._db
+            self._collection = db.collection(self._collection_name)
+        return self._collection
+
+    def create(self, job):
+        self.collection.document(job['id']).set(job)
+        return job
+
+    def get(self, job_id):
+        snapshot = self.collection.document(job_id).get()
+        if not snapshot.exists:
+            return None
+        job = snapshot.to_dict()
+        # Firestore returns timezone-aware datetimes; keep the store interface naive UTC
+        for key in ('created_at', 'updated_at'):
+            if job.get(key) is not None and job[key].tzinfo is not None:
+                job[key] = job[key].replace(tzinfo=None)
+        if isinstance(job.get('result'), str):
+            job['result'] = json.loads(job['result'])
+        return job
+
+    def update(self, job_id, **fields):
+        fields['updated_at'] = _now()
+        if fields.get('result') is not None:
+            fields['result'] = json.dumps(fields['result'])
+        self.collection.document(job_id).update(fields)
+
+
+def create_job_store(kind=None, db=None):
+    """Build the job store selected by JOB_STORE (memory, sqlite or firestore)."""
+    kind = kind or os.getenv('JOB_STORE', 'firestore')
+    if kind == 'memory':
+        return MemoryJobStore()
+    if kind == 'sqlite':
+        return SQLiteJobStore(os.getenv('JOB_STORE_PATH', '/tmp/aicre_jobs.sqlite3'))
+    if kind == 'firestore':
+        if db is None:
+            raise ValueError("Firestore job store requires a Firestore client")
+        return FirestoreJobStore(db)
+    raise ValueError(f"Unknown job store: {kind}")
+
+
+class JobQueueFull(RuntimeError):
+    """Raised by JobRunner.submit when max_pending jobs are already queued or running."""
+
+
+class JobRunner:
+    """
+    Runs job functions on a bounded thread pool and records their outcome in a store.
+
+    At most `max_pending` jobs are queued or running at once; past that, submit() raises
+    JobQueueFull instead of letting queued jobs (and the arguments they hold) pile up.
+    """
+
+    def __init__(self, store, max_workers=None, max_pending=None):
+        self.store = store
+        self.max_workers = max_workers or int(os.getenv('JOB_WORKERS', '4'))
+        self.max_pending = max_pending or int(os.getenv('JOB_QUEUE_SIZE', str(self.max_workers * 8)))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, payload=None, **kwargs):
+        """Create a job and queue fn(*args, **kwargs) to run in the background. Returns the job record."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"Job queue is full ({self.max_pending} pending)")
+            self._pending += 1
+        try:
+            job = self.store.create(new_job(kind, payload))
+            self._executor.submit(self._run, job['id'], fn, args, kwargs)
+        except Exception:
+            self._release()
+            raise
+        return job
+
+    def pending(self):
+        """Jobs queued or running."""
+        return self._pending
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _run(self, job_id, fn, args, kwargs):
+        try:
+            self.store.update(job_id, status=RUNNING)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                logging.exception(f"Job {job_id} failed")
+                self._fail(job_id, str(e))
+                return
+            try:
+                self.store.update(job_id, status=DONE, result=result)
+            except Exception as e:
+                # e.g. a result over Firestore's 1 MiB document limit; don't leave the job running
+                logging.exception(f"Could not store the result of job {job_id}")
+                self._fail(job_id, f"Could not store the result: {e}")
+        finally:
+            self._release()
+
+    def _fail(self, job_id, error):
+        try:
+            self.store.update(job_id, status=FAILED, error=error)
+        except Exception:
+            logging.exception(f"Could not mark job {job_id} as failed")
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,57 @@
+import os
+import queue
+import atexit
+import logging
+import logging.handlers
+
+# Log file and level for the API and its scrapers
+LOG_FILE = os.getenv('LOG_FILE', 'scrape.log')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+_settings = {}
+
+
+def configure_logging(path=LOG_FILE, level=LOG_LEVEL):
+    """
+    Sends root logging through a queue to a background thread that does the file I/O, so
+    request threads only pay for an in-memory put. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    _settings.update(path=path, level=level)
+
+    file_handler = logging.FileHandler(path, mode='a') if path else logging.StreamHandler()
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    if not _settings.get('registered'):
+        atexit.register(stop_logging)
+        # The writer thread doesn't survive a fork (e.g. gunicorn workers), so forked children start their own
+        os.register_at_fork(after_in_child=_restart_in_child)
+        _settings['registered'] = True
+
+
+def stop_logging():
+    """Flushes queued records and stops the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_in_child():
+    global _listener
+    if _listener is not None:
+        _listener = None
+        configure_logging(_settings['path'], _settings['level'])
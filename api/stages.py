@@ -0,0 +1,66 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+
+def stage_pool(name, max_workers):
+    """
+    A thread pool for one caller's stages, sized by <NAME>_STAGE_WORKERS if set.
+
+    Each caller gets its own pool, so a large batch (or stages stuck past their deadline)
+    only holds up that caller's work, not document uploads or news requests.
+    """
+    workers = int(os.getenv(f"{name.upper()}_STAGE_WORKERS", str(max_workers)))
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-stage")
+
+
+# Pool for callers that don't bring their own
+_default_pool = stage_pool('default', 4)
+
+
+def run_stages(stages, timeouts=None, default_timeout=None, pool=None):
+    """
+    Runs independent stages concurrently on `pool` and waits for all of them.
+
+    `stages` maps a stage name to a zero-argument callable. `timeouts` maps a stage
+    name to its deadline in seconds, measured from when that stage starts running, so
+    time spent queued behind other stages in the pool doesn't count against it.
+    Returns (results, errors): results holds the value of every stage that finished,
+    errors holds a message for every stage that raised or ran past its deadline.
+    A stage that times out keeps running in the background, but its result is dropped.
+    """
+    timeouts = timeouts or {}
+    pool = pool or _default_pool
+    started = {name: threading.Event() for name in stages}
+    start_times = {}
+
+    def run(name, fn):
+        start_times[name] = time.monotonic()
+        started[name].set()
+        return fn()
+
+    futures = {name: pool.submit(run, name, fn) for name, fn in stages.items()}
+
+    results = {}
+    errors = {}
+    for name, future in futures.items():
+        timeout = timeouts.get(name, default_timeout)
+        try:
+            if timeout is None:
+                results[name] = future.result()
+            else:
+                # A stage cancelled before it started (pool shutting down) never sets its event
+                while not started[name].wait(0.1) and not future.done():
+                    pass
+                remaining = max(0, start_times.get(name, time.monotonic()) + timeout - time.monotonic())
+                results[name] = future.result(timeout=remaining)
+        except TimeoutError:
+            logging.error(f"Stage {name} timed out after {timeout}s")
+            errors[name] = f"Timed out after {timeout}s"
+        except Exception as e:
+            logging.error(f"Stage {name} failed: {e}")
+            errors[name] = str(e)
+
+    return results, errors
@@ -1,25 +1,52 @@
 import os
 import requests
 import json
+from api.tools import http_client
+from api.tools.census_store import (
+    get_census_store, split_fips, parse_acs_value, format_acs_value, LEVELS, DEFAULT_VARIABLES, CENSUS_YEAR,
+    MAX_VARIABLES_PER_REQUEST
+)
+from api.stages import run_stages, stage_pool
+from api.metrics import timed
+
+# Geography codes listed in one `for` clause; keeps request URLs well under server limits
+MAX_CODES_PER_REQUEST = int(os.getenv('CENSUS_MAX_CODES_PER_REQUEST', '500'))
+# Deadline for each upstream request of a batch (seconds)
+CENSUS_BATCH_TIMEOUT = float(os.getenv('CENSUS_BATCH_TIMEOUT', '30'))
+# Pool for the planned ACS requests of batch lookups
+census_stages = stage_pool('census', 8)
 
 # Census Bureau API URL (modify to match your specific data requirements)
 CENSUS_API_BASE_URL = "https://api.census.gov/data"
 
-# Fetch Census data for a given region
-def get_census_data(region: str):
+# ACS variables behind the SREO region figures: total population and total housing units
+POPULATION_VARIABLE = 'B01003_001E'
+HOUSING_UNITS_VARIABLE = 'B25001_001E'
+
+# Fetch Census data for a given region (a state FIPS code), from the local store when it has been ingested
+def get_census_data(region: str, variables=None):
+    variables = variables or DEFAULT_VARIABLES
+    local = query_census([region], variables, level='state')
+    if local is not None and local['fips']:
+        return {
+            "census_results": columns_to_records(local, 'state', as_strings=True),
+            "message": "Successfully retrieved Census data"
+        }
+
     # Adjust the API endpoint and parameters to match the Census data of interest
     api_key = os.getenv('NEXT_PUBLIC_CENSUS_API_KEY')  # Ensure that the API key is set as an environment variable
-    endpoint = f"{CENSUS_API_BASE_URL}/2019/acs/acs5"
+    endpoint = f"{CENSUS_API_BASE_URL}/{CENSUS_YEAR}/acs/acs5"
     
     # You can adjust the query parameters here, depending on the data fields needed
     params = {
-        "get": "NAME,B01003_001E",  # Modify based on the Census data fields you need (e.g., population)
+        "get": ",".join(["NAME"] + variables),  # Modify based on the Census data fields you need (e.g., population)
         "for": f"state:{region}",  # Region/state can be passed to filter data
         "key": api_key
     }
 
     try:
-        response = requests.get(endpoint, params=params)
+        with timed('census.fetch'):
+            response = http_client.get(endpoint, params=params)
         response.raise_for_status()
         data = response.json()
 
@@ -29,6 +56,146 @@ def get_census_data(region: str):
         print(f"Error fetching Census data: {e}")
         return {"error": "Failed to fetch census data"}
 
+# Query the local store for many regions and variables at once; None if the store can't answer
+def query_census(regions, variables=None, level='state'):
+    return get_census_store().lookup(regions, variables, level=level)
+
+# Group regions into the fewest ACS requests: the API takes a comma-separated list of codes
+# in `for`, but counties must share a state and tracts a state and county in `in`
+def plan_census_requests(regions, level):
+    geography = LEVELS[level]['fips']
+    groups = {}
+    for fips in regions:
+        parts = split_fips(fips, level)
+        parents = tuple(f"{column}:{parts[column]}" for column in geography[:-1])
+        groups.setdefault(parents, []).append(parts[geography[-1]])
+
+    requests_plan = []
+    for parents, codes in groups.items():
+        codes = sorted(set(codes))
+        for start in range(0, len(codes), MAX_CODES_PER_REQUEST):
+            requests_plan.append({
+                'for': f"{geography[-1]}:{','.join(codes[start:start + MAX_CODES_PER_REQUEST])}",
+                'in': ' '.join(parents) or None,
+            })
+    return requests_plan
+
+# Fetch many regions of one level from the ACS API, running the planned requests concurrently
+def fetch_census_batch(regions, variables=None, level='state', year=CENSUS_YEAR):
+    variables = variables or DEFAULT_VARIABLES
+    api_key = os.getenv('NEXT_PUBLIC_CENSUS_API_KEY')
+    geography = LEVELS[level]['fips']
+    endpoint = f"{CENSUS_API_BASE_URL}/{year}/acs/acs5"
+
+    def fetch(clauses, chunk):
+        params = {"get": ",".join(["NAME"] + chunk), "for": clauses['for'], "key": api_key}
+        if clauses['in']:
+            params["in"] = clauses['in']
+        with timed('census.fetch'):
+            response = http_client.get(endpoint, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    stages = {}
+    for clauses in plan_census_requests(regions, level):
+        for start in range(0, len(variables), MAX_VARIABLES_PER_REQUEST):
+            chunk = variables[start:start + MAX_VARIABLES_PER_REQUEST]
+            name = f"{clauses['in'] or level} {clauses['for'].split(',')[0]} vars {start}+"
+            stages[name] = (lambda clauses=clauses, chunk=chunk: (chunk, fetch(clauses, chunk)))
+    results, errors = run_stages(stages, default_timeout=CENSUS_BATCH_TIMEOUT, pool=census_stages)
+
+    by_fips = {}
+    for chunk, rows in results.values():
+        header = rows[0]
+        fips_columns = [header.index(column) for column in geography]
+        value_columns = [header.index(variable) for variable in chunk]
+        name_column = header.index('NAME')
+        for row in rows[1:]:
+            record = by_fips.setdefault(''.join(row[c] for c in fips_columns), {'NAME': row[name_column]})
+            for variable, column in zip(chunk, value_columns):
+                record[variable] = parse_acs_value(row[column])
+
+    columns = {'fips': [], 'NAME': [], **{variable: [] for variable in variables}}
+    for fips in regions:
+        record = by_fips.get(fips)
+        if record is None:
+            continue
+        columns['fips'].append(fips)
+        columns['NAME'].append(record['NAME'])
+        for variable in variables:
+            value = record.get(variable)
+            columns[variable].append(None if value is None or value != value else value)
+    return columns, errors
+
+# Many regions and variables in one call: answered from the local store where it can, and
+# the remaining regions fetched from the API in as few requests as possible. Columns follow the
+# order regions were requested in (duplicates once); regions without data are left out
+def get_census_batch(regions, variables=None, level='state', year=CENSUS_YEAR):
+    variables = variables or DEFAULT_VARIABLES
+    regions = list(dict.fromkeys(regions))
+    local = get_census_store().lookup(regions, variables, level=level, year=year)
+    errors = {}
+    parts = [local] if local is not None else []
+    found = set(local['fips']) if local is not None else set()
+    missing = [r for r in regions if r not in found]
+    if missing:
+        fetched, errors = fetch_census_batch(missing, variables, level, year)
+        parts.append(fetched)
+
+    row_of = {}
+    for part in parts:
+        for i, fips in enumerate(part['fips']):
+            row_of[fips] = (part, i)
+    columns = {'fips': [], 'NAME': [], **{variable: [] for variable in variables}}
+    for fips in regions:
+        if fips not in row_of:
+            continue
+        part, i = row_of[fips]
+        for key in columns:
+            columns[key].append(part[key][i])
+    return columns, errors
+
+# SREO figures for many regions, shaped like {'housing': {'stock'}, 'population': {'growth'}}: the
+# ACS housing-unit count, and the change in total population since the previous ACS year. The Census
+# Bureau doesn't publish GDP, so callers that need it must supply it. Returns ({region: figures}, errors)
+def get_region_figures(regions, level='state', year=CENSUS_YEAR):
+    current, errors = get_census_batch(regions, [POPULATION_VARIABLE, HOUSING_UNITS_VARIABLE], level, year)
+    previous, previous_errors = get_census_batch(regions, [POPULATION_VARIABLE], level, str(int(year) - 1))
+    errors.update({f"{int(year) - 1} {name}": error for name, error in previous_errors.items()})
+    previous_population = dict(zip(previous['fips'], previous[POPULATION_VARIABLE]))
+
+    figures = {}
+    for i, fips in enumerate(current['fips']):
+        population = current[POPULATION_VARIABLE][i]
+        before = previous_population.get(fips)
+        growth = (population - before) / before if population is not None and before else None
+        figures[fips] = {
+            'housing': {'stock': current[HOUSING_UNITS_VARIABLE][i]},
+            'population': {'growth': growth},
+        }
+    return figures, errors
+
+# The census source of a single report: one region's SREO figures
+def get_region_data(region: str):
+    figures, errors = get_region_figures([region])
+    if region not in figures:
+        return {"error": next(iter(errors.values()), f"No census data for region {region}")}
+    return figures[region]
+
+# Turn a columnar store result into row dicts shaped like the Census API's; with as_strings,
+# values are formatted as the API returns them (None where the estimate is unavailable)
+def columns_to_records(columns, level, as_strings=False):
+    variables = [key for key in columns if key not in ('fips', 'NAME')]
+    records = []
+    for i, fips in enumerate(columns['fips']):
+        record = {'NAME': columns['NAME'][i]}
+        for variable in variables:
+            value = columns[variable][i]
+            record[variable] = format_acs_value(value) if as_strings else value
+        record.update(split_fips(fips, level))
+        records.append(record)
+    return records
+
 # Parse and format the fetched Census data
 def parse_census_data(raw_data):
     # Example of converting raw data to a more usable format
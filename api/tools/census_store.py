@@ -0,0 +1,246 @@
+"""
+Local copy of ACS 5-year data, stored as memory-mapped NumPy arrays indexed by FIPS code.
+
+ACS 5-year estimates change once a year, so the geographies and variables we use are
+downloaded once by the ingest job below and answered locally afterwards:
+
+    python -m api.tools.census_store ingest --levels state,county --variables B01003_001E,B19013_001E
+
+Each (year, level) is a float64 matrix (one row per geography, one column per variable)
+plus a JSON file with the FIPS codes, names and variable list.
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+
+import numpy as np
+
+from api.tools import http_client
+
+CENSUS_API_BASE_URL = "https://api.census.gov/data"
+CENSUS_YEAR = os.getenv('CENSUS_YEAR', '2019')
+CENSUS_STORE_DIR = os.getenv('CENSUS_STORE_DIR', os.path.join(os.path.dirname(__file__), 'census_data'))
+DEFAULT_VARIABLES = ['B01003_001E']
+
+# ACS geography for each level: the `for` clause, the `in` clause if the API needs one, and
+# the response columns that concatenate to the FIPS code
+LEVELS = {
+    'state': {'for': 'state:*', 'in': None, 'fips': ['state']},
+    'county': {'for': 'county:*', 'in': 'state:*', 'fips': ['state', 'county']},
+    'tract': {'for': 'tract:*', 'in': 'state:{state} county:*', 'fips': ['state', 'county', 'tract']},
+    'zip': {'for': 'zip code tabulation area:*', 'in': None, 'fips': ['zip code tabulation area']},
+}
+# Width of each geography code within a FIPS code
+FIPS_WIDTHS = {'state': 2, 'county': 3, 'tract': 6, 'zip code tabulation area': 5}
+# The API accepts at most 50 fields per request, NAME included
+MAX_VARIABLES_PER_REQUEST = 49
+
+
+def split_fips(fips, level):
+    """The ACS geography columns of a FIPS code, e.g. '06037' at county level -> {'state': '06', 'county': '037'}."""
+    parts = {}
+    start = 0
+    for column in LEVELS[level]['fips']:
+        parts[column] = fips[start:start + FIPS_WIDTHS[column]]
+        start += FIPS_WIDTHS[column]
+    return parts
+
+
+def is_fips(code, level):
+    """True if `code` is a FIPS code of the given level, e.g. '06' for a state or '06037' for a county."""
+    width = sum(FIPS_WIDTHS[column] for column in LEVELS[level]['fips'])
+    return isinstance(code, str) and len(code) == width and code.isdigit()
+
+
+def parse_acs_value(value):
+    # ACS marks unavailable estimates with large negative sentinels (e.g. -666666666)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return np.nan if number <= -111111111 else number
+
+
+def format_acs_value(value):
+    """A stored value in the API's string form ('39512223', '38.2'); None for an unavailable estimate."""
+    if value is None or value != value:
+        return None
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class CensusTable:
+    """One ingested (year, level): a read-only memory-mapped matrix and its FIPS index."""
+
+    def __init__(self, meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        self.meta_path = meta_path
+        self.mtime = os.path.getmtime(meta_path)
+        self.year = meta['year']
+        self.level = meta['level']
+        self.variables = meta['variables']
+        self.fips = meta['fips']
+        self.names = meta['names']
+        self.values = np.load(os.path.join(os.path.dirname(meta_path), meta['values_file']), mmap_mode='r')
+        self.row_of = {fips: row for row, fips in enumerate(self.fips)}
+        self.column_of = {variable: column for column, variable in enumerate(self.variables)}
+
+    def has(self, variables):
+        return all(variable in self.column_of for variable in variables)
+
+    def lookup(self, regions, variables):
+        """
+        Columnar result for the given FIPS codes and variables: {'fips', 'NAME', <variable>: [...]}.
+        Regions not in the table are skipped; None means every region.
+        """
+        rows = list(range(len(self.fips))) if regions is None else \
+            [self.row_of[r] for r in regions if r in self.row_of]
+        columns = [self.column_of[v] for v in variables]
+        block = self.values[np.ix_(rows, columns)] if rows and columns else np.empty((len(rows), len(columns)))
+        result = {'fips': [self.fips[r] for r in rows], 'NAME': [self.names[r] for r in rows]}
+        for i, variable in enumerate(variables):
+            result[variable] = [None if np.isnan(v) else v for v in block[:, i].tolist()]
+        return result
+
+
+class CensusStore:
+    """Opens ingested tables on demand and picks up re-ingested ones without a restart."""
+
+    def __init__(self, root=CENSUS_STORE_DIR):
+        self.root = root
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _meta_path(self, year, level):
+        return os.path.join(self.root, str(year), f"{level}.json")
+
+    def table(self, level, year=CENSUS_YEAR):
+        """The table for a level, or None if it hasn't been ingested."""
+        meta_path = self._meta_path(year, level)
+        try:
+            mtime = os.path.getmtime(meta_path)
+        except OSError:
+            return None
+        table = self._tables.get((year, level))
+        if table is None or table.mtime != mtime:
+            with self._lock:
+                table = CensusTable(meta_path)
+                self._tables[(year, level)] = table
+        return table
+
+    def lookup(self, regions, variables=None, level='state', year=CENSUS_YEAR):
+        """Columnar data for the regions, or None if the level or a variable isn't in the store."""
+        variables = variables or DEFAULT_VARIABLES
+        table = self.table(level, year)
+        if table is None or not table.has(variables):
+            return None
+        return table.lookup(regions, variables)
+
+    def write(self, level, year, variables, fips, names, values):
+        """
+        Saves a table under a new, versioned values file. The JSON file is replaced last, so readers
+        never see a half-written table. The values file it replaces is kept, since other workers may
+        still be opening it, and removed on the next write.
+        """
+        directory = os.path.join(self.root, str(year))
+        os.makedirs(directory, exist_ok=True)
+        values_file = f"{level}-{time.time_ns()}.npy"
+        np.save(os.path.join(directory, values_file), np.asarray(values, dtype=np.float64).reshape(len(fips), len(variables)))
+
+        meta_path = self._meta_path(year, level)
+        previous = None
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                previous = json.load(f).get('values_file')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump({'year': str(year), 'level': level, 'variables': variables, 'fips': fips,
+                       'names': names, 'values_file': values_file, 'ingested_at': time.time()}, f)
+        os.replace(meta_path + '.tmp', meta_path)
+        for name in os.listdir(directory):
+            if name.startswith(f"{level}-") and name.endswith('.npy') and name not in (values_file, previous):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+
+_store = None
+
+
+def get_census_store():
+    global _store
+    if _store is None:
+        _store = CensusStore()
+    return _store
+
+
+def _fetch_rows(year, level, variables, api_key, state=None):
+    """Rows of one ACS request: [header, row, ...]."""
+    spec = LEVELS[level]
+    params = {'get': ','.join(['NAME'] + variables), 'for': spec['for'], 'key': api_key}
+    if spec['in']:
+        params['in'] = spec['in'].format(state=state)
+    response = http_client.get(f"{CENSUS_API_BASE_URL}/{year}/acs/acs5", params=params, timeout=(5, 120))
+    response.raise_for_status()
+    return response.json()
+
+
+def _state_codes(year, api_key):
+    rows = _fetch_rows(year, 'state', [], api_key)
+    column = rows[0].index('state')
+    return sorted(row[column] for row in rows[1:])
+
+
+def ingest(level, variables, year=CENSUS_YEAR, api_key=None, store=None):
+    """Downloads every geography of a level for the variables and writes it to the store."""
+    api_key = api_key or os.getenv('NEXT_PUBLIC_CENSUS_API_KEY')
+    store = store or get_census_store()
+    spec = LEVELS[level]
+    # Tracts can only be listed one state at a time
+    states = _state_codes(year, api_key) if '{state}' in (spec['in'] or '') else [None]
+
+    by_fips = {}
+    for start in range(0, len(variables), MAX_VARIABLES_PER_REQUEST):
+        chunk = variables[start:start + MAX_VARIABLES_PER_REQUEST]
+        for state in states:
+            rows = _fetch_rows(year, level, chunk, api_key, state)
+            header = rows[0]
+            fips_columns = [header.index(c) for c in spec['fips']]
+            value_columns = [header.index(v) for v in chunk]
+            for row in rows[1:]:
+                fips = ''.join(row[c] for c in fips_columns)
+                record = by_fips.setdefault(fips, {'NAME': row[header.index('NAME')]})
+                for variable, column in zip(chunk, value_columns):
+                    record[variable] = parse_acs_value(row[column])
+
+    fips = sorted(by_fips)
+    names = [by_fips[f]['NAME'] for f in fips]
+    values = [[by_fips[f].get(v, np.nan) for v in variables] for f in fips]
+    store.write(level, year, variables, fips, names, values)
+    logging.info(f"Ingested {len(fips)} {level} rows x {len(variables)} variables for ACS {year}")
+    return len(fips)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    ingest_parser = subcommands.add_parser('ingest', help='download ACS tables into the store')
+    ingest_parser.add_argument('--levels', default='state,county')
+    ingest_parser.add_argument('--variables', default=','.join(DEFAULT_VARIABLES))
+    ingest_parser.add_argument('--year', default=CENSUS_YEAR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    variables = [v.strip() for v in args.variables.split(',') if v.strip()]
+    for level in args.levels.split(','):
+        started = time.perf_counter()
+        count = ingest(level.strip(), variables, args.year)
+        print(f"{level}: {count} rows in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
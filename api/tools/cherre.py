@@ -0,0 +1,6 @@
+import logging
+
+# Cherre neighborhood data isn't integrated yet; reports show this source as unavailable
+def get_cherre_data(region: str):
+    logging.error(f"Cherre data requested for {region}, but no Cherre integration is configured")
+    return {"error": "Cherre integration is not configured"}
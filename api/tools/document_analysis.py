@@ -0,0 +1,180 @@
+import os
+import re
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+from api.metrics import timed
+
+# Bump when the prompts or parameters change so cached analyses are recomputed
+PROMPT_VERSION = 2
+
+GPT_MODEL = os.getenv('GPT_MODEL', 'gpt-4')
+# Input tokens per chunk; leaves room for the prompt and the 1500-token answer in GPT-4's 8k context
+GPT_CHUNK_TOKENS = int(os.getenv('GPT_CHUNK_TOKENS', '5000'))
+GPT_MAX_TOKENS = int(os.getenv('GPT_MAX_TOKENS', '1500'))
+# Upper bound on GPT calls in flight across the whole process
+GPT_MAX_CONCURRENCY = int(os.getenv('GPT_MAX_CONCURRENCY', '4'))
+GPT_MAX_RETRIES = int(os.getenv('GPT_MAX_RETRIES', '5'))
+
+SYSTEM_PROMPT = "You are an AI that extracts relevant data from commercial real estate documents."
+EXTRACT_PROMPT = "Extract all important data from this document:\n{text}"
+EXTRACT_PART_PROMPT = (
+    "This is part {index} of {count} of a document. "
+    "Extract all important data from this part:\n{text}"
+)
+REDUCE_PROMPT = (
+    "The following are data extractions from consecutive parts of one document. "
+    "Combine them into a single extraction, merging duplicates and keeping every distinct figure:\n{text}"
+)
+
+_gpt_slots = threading.BoundedSemaphore(GPT_MAX_CONCURRENCY)
+
+try:
+    import tiktoken
+    _encoding = tiktoken.encoding_for_model(GPT_MODEL)
+except Exception:
+    _encoding = None
+
+
+def count_tokens(text):
+    """
+    Token count for the configured model. Without tiktoken, assumes 2.5 characters per token:
+    figures and tables in real estate documents tokenize far denser than English prose's ~4,
+    and overestimating only costs an extra chunk, while underestimating overflows the context.
+    """
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(text) * 2 // 5 + 1
+
+
+class OpenAIChatClient:
+    """Thin wrapper over openai.ChatCompletion so analysis can be run against a stub in tests."""
+
+    retryable_errors = (
+        openai.error.RateLimitError,
+        openai.error.APIConnectionError,
+        openai.error.ServiceUnavailableError,
+        openai.error.Timeout,
+    )
+
+    def __init__(self, model=GPT_MODEL):
+        self.model = model
+
+    def complete(self, messages, max_tokens):
+        response = openai.ChatCompletion.create(model=self.model, messages=messages, max_tokens=max_tokens)
+        return response['choices'][0]['message']['content']
+
+
+def _split(text, separator_pattern):
+    """Splits text after each separator, keeping the separators attached."""
+    pieces = re.split(f"(?<={separator_pattern})", text)
+    return [piece for piece in pieces if piece]
+
+
+def chunk_text(text, max_tokens=GPT_CHUNK_TOKENS):
+    """
+    Splits text into chunks of at most max_tokens, preferring page breaks,
+    then section breaks (blank lines), then line breaks, then hard cuts.
+    """
+    if count_tokens(text) <= max_tokens:
+        return [text] if text else []
+
+    for separator in (r"\f", r"\n\n", r"\n"):
+        pieces = _split(text, separator)
+        if len(pieces) > 1:
+            break
+    else:
+        # No natural boundary left; cut by estimated characters per token
+        size = max(1, len(text) * max_tokens // count_tokens(text))
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+
+    chunks = []
+    current = ""
+    current_tokens = 0
+    for piece in pieces:
+        tokens = count_tokens(piece)
+        if tokens > max_tokens:
+            if current:
+                chunks.append(current)
+                current, current_tokens = "", 0
+            chunks.extend(chunk_text(piece, max_tokens))
+        elif current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = piece, tokens
+        else:
+            current += piece
+            current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _complete_with_retry(client, prompt, max_tokens=GPT_MAX_TOKENS, max_retries=GPT_MAX_RETRIES):
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+    retryable = getattr(client, 'retryable_errors', ())
+    for attempt in range(max_retries + 1):
+        try:
+            with _gpt_slots, timed('gpt.complete'):
+                return client.complete(messages, max_tokens)
+        except retryable as e:
+            if attempt == max_retries:
+                raise
+            # Exponential backoff with jitter
+            delay = min(60, 2 ** attempt) * random.uniform(0.5, 1.0)
+            logging.warning(f"GPT call failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def analyze_document(text, client=None, chunk_tokens=GPT_CHUNK_TOKENS, max_concurrency=GPT_MAX_CONCURRENCY):
+    """
+    Extracts data from a document of any length with GPT.
+    Chunks are analyzed in parallel and the partial extractions are merged by a reduce call.
+    """
+    client = client or OpenAIChatClient()
+    chunks = chunk_text(text, chunk_tokens)
+    if len(chunks) <= 1:
+        return _complete_with_retry(client, EXTRACT_PROMPT.format(text=text))
+
+    prompts = [
+        EXTRACT_PART_PROMPT.format(index=i + 1, count=len(chunks), text=chunk)
+        for i, chunk in enumerate(chunks)
+    ]
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='gpt') as executor:
+        partials = list(executor.map(lambda prompt: _complete_with_retry(client, prompt), prompts))
+
+    return reduce_extractions(partials, client, chunk_tokens, max_concurrency)
+
+
+def reduce_extractions(partials, client, chunk_tokens=GPT_CHUNK_TOKENS, max_concurrency=GPT_MAX_CONCURRENCY):
+    """Merges partial extractions, in several rounds if they don't fit one prompt."""
+    while len(partials) > 1:
+        groups = []
+        current = []
+        for partial in partials:
+            if current and count_tokens("\n\n".join(current + [partial])) > chunk_tokens:
+                groups.append(current)
+                current = []
+            current.append(partial)
+        groups.append(current)
+
+        if len(groups) == len(partials) and len(groups) > 1:
+            # Every partial fills a prompt on its own; pair them up so each round makes progress
+            groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+
+        def reduce_group(group):
+            if len(group) == 1:
+                return group[0]
+            return _complete_with_retry(client, REDUCE_PROMPT.format(text="\n\n".join(group)))
+
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='gpt') as executor:
+            partials = list(executor.map(reduce_group, groups))
+
+    return partials[0]
@@ -1,10 +1,13 @@
 import fitz  # PyMuPDF
 import re
 import json
-import spacy
+import os
+import functools
+from api.tools.nlp import get_nlp
+from api.metrics import timed
 
-# Load the spaCy model for entity recognition
-nlp = spacy.load("en_core_web_sm")
+# Bump when extraction output changes so cached results are recomputed
+EXTRACTOR_VERSION = 2
 
 # Dictionary of common real estate terms and patterns
 keyword_dict = {
@@ -32,32 +35,153 @@ keyword_dict = {
     "net_cash_flow": r"(net cash flow):?\s*\$?([\d,\.]+)",
 }
 
-def extract_data_from_pdf(file_path):
-    """Extracts tenant, property, and additional financial details from a PDF file."""
-    extracted_data = {
+# Patterns compiled once at import
+KEYWORD_PATTERNS = {key: re.compile(pattern, re.IGNORECASE) for key, pattern in keyword_dict.items()}
+
+def _literal_prefixes(pattern):
+    """
+    Returns the lowercase literal strings one of which every match of `pattern` starts with,
+    or None when the pattern doesn't start with a plain literal (or group of literal alternatives).
+    """
+    group = re.match(r"\((?:\?:)?([^()]*)\)", pattern)
+    if group:
+        # An optional group doesn't have to appear at the start of a match
+        if pattern[group.end():group.end() + 1] in ("?", "*", "{"):
+            return None
+        alternatives = group.group(1).split("|")
+    elif "|" in pattern:
+        return None
+    else:
+        alternatives = [pattern]
+    prefixes = []
+    for alternative in alternatives:
+        literal = re.match(r"(?:\\\$|[\w ])*", alternative).group(0)
+        characters = re.findall(r"\\\$|[\w ]", literal)
+        # A quantifier after the literal makes its last character optional
+        if alternative[len(literal):len(literal) + 1] in ("?", "*", "{"):
+            characters = characters[:-1]
+        if not characters:
+            return None
+        prefixes.append("".join("$" if c == "\\$" else c for c in characters).lower())
+    return prefixes
+
+KEYWORD_PREFIXES = {key: _literal_prefixes(pattern) for key, pattern in keyword_dict.items()}
+
+@functools.lru_cache(maxsize=256)
+def _keyword_scanner(keys, ignorecase):
+    """One zero-width alternation over the literal prefixes of `keys`, longest first."""
+    prefixes = sorted({prefix for key in keys for prefix in KEYWORD_PREFIXES[key]}, key=len, reverse=True)
+    return re.compile("(?=" + "|".join(re.escape(prefix) for prefix in prefixes) + ")",
+                      re.IGNORECASE if ignorecase else 0)
+
+def match_keywords(text):
+    """
+    Finds the first match of every keyword pattern, as re.search would, in a single scan.
+
+    The scanner jumps between positions where any still-missing keyword's literal
+    prefix occurs, checks the missing keywords there, and drops each keyword from the
+    scan once it is found. ASCII text is scanned lowercased, which lets the regex
+    engine use its fast literal checks; other text is scanned case-insensitively.
+    Patterns without a literal prefix are searched on their own.
+    """
+    matches = {}
+    for key, prefixes in KEYWORD_PREFIXES.items():
+        if prefixes is None:
+            match = KEYWORD_PATTERNS[key].search(text)
+            if match:
+                matches[key] = match
+
+    ascii_text = text.isascii()
+    haystack = text.lower() if ascii_text else text
+    keys = tuple(key for key, prefixes in KEYWORD_PREFIXES.items() if prefixes is not None)
+    pos = 0
+    while keys:
+        candidate = _keyword_scanner(keys, not ascii_text).search(haystack, pos)
+        if not candidate:
+            break
+        pos = candidate.start()
+        for key in keys:
+            match = KEYWORD_PATTERNS[key].match(text, pos)
+            if match:
+                matches[key] = match
+        keys = tuple(key for key in keys if key not in matches)
+        pos += 1
+
+    return {key: matches[key] for key in keyword_dict if key in matches}
+
+# spaCy batching; chunks keep each Doc well under spaCy's max_length
+NLP_BATCH_SIZE = int(os.getenv('NLP_BATCH_SIZE', '16'))
+NLP_N_PROCESS = int(os.getenv('NLP_N_PROCESS', '1'))
+NLP_CHUNK_CHARS = int(os.getenv('NLP_CHUNK_CHARS', '100000'))
+
+# Extract tenants, financial details, and statuses
+tenant_pattern = re.compile(
+    r"(\w[\w\s]+?)\s+(\$\d[\d,\.]+)\s+([\w\s&,.]+)",
+    re.MULTILINE
+)
+
+# Catch-all pattern for additional unstructured key-value pairs
+general_data_pattern = re.compile(r"(\b\w+\b(?: \b\w+\b){0,3})\s*:\s*(.+)")
+
+def open_pdf(source):
+    """Opens a PDF from a file path, or from its bytes without touching disk."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+def iter_pdf_pages(source):
+    """Yields the text of each page of a PDF (path or bytes), one page at a time."""
+    with open_pdf(source) as pdf:
+        for page in pdf:
+            yield page.get_text()
+
+def iter_text_chunks(pages, max_chars=NLP_CHUNK_CHARS):
+    """Groups page texts into chunks of at most max_chars, splitting oversized pages on line breaks."""
+    chunk = []
+    size = 0
+    for page in pages:
+        pieces = [page]
+        if len(page) > max_chars:
+            pieces = _split_long_text(page, max_chars)
+        for piece in pieces:
+            if size + len(piece) > max_chars and chunk:
+                yield "".join(chunk)
+                chunk = []
+                size = 0
+            chunk.append(piece)
+            size += len(piece)
+    if chunk:
+        yield "".join(chunk)
+
+def _split_long_text(text, max_chars):
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            newline = text.rfind("\n", start, end)
+            if newline > start:
+                end = newline + 1
+        pieces.append(text[start:end])
+        start = end
+    return pieces
+
+def _new_extracted_data():
+    return {
         "property_details": {},
         "tenants": [],
         "financial_details": [],
         "additional_entities": {}
     }
 
-    # Read and concatenate all text in the PDF
-    with fitz.open(file_path) as pdf:
-        text = ""
-        for page in pdf:
-            text += page.get_text()
-
+def _extract_patterns(text, extracted_data):
+    """Fills property details, tenants and financial details from the regex patterns."""
     # Extract specific property details based on expanded keywords
-    for key, pattern in keyword_dict.items():
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            extracted_data["property_details"][key] = match.group(1).strip()
-
-    # Extract tenants, financial details, and statuses
-    tenant_pattern = re.compile(
-        r"(\w[\w\s]+?)\s+\$\d[\d,\.]+\s+([\w\s&,.]+)",
-        re.MULTILINE
-    )
+    for key, match in match_keywords(text).items():
+        # The value is the last group; earlier groups capture the label it follows
+        value = match.group(match.re.groups) if match.re.groups else match.group(0)
+        extracted_data["property_details"][key] = value.strip()
+
     for match in tenant_pattern.finditer(text):
         tenant_name = match.group(1).strip()
         amount = match.group(2).strip()
@@ -74,40 +198,104 @@ def extract_data_from_pdf(file_path):
             "payment_status": status
         })
 
-    # Process text with spaCy to capture additional entities
-    doc = nlp(text)
+def _new_entity_state():
+    return {
+        "by_label": {},
+        # Additional structured fields from spaCy NER
+        "structured": {
+            "organizations": [],
+            "dates": [],
+            "monetary_values": []
+        }
+    }
+
+def _merge_entities(doc, state):
+    """Adds the entities of one chunk to the running entity state."""
+    by_label = state["by_label"]
+    structured = state["structured"]
     for ent in doc.ents:
         entity_type = ent.label_.lower()
         entity_text = ent.text.strip()
 
-        if entity_type not in extracted_data["additional_entities"]:
-            extracted_data["additional_entities"][entity_type] = []
+        if entity_type not in by_label:
+            by_label[entity_type] = []
 
-        if entity_text not in extracted_data["additional_entities"][entity_type]:
-            extracted_data["additional_entities"][entity_type].append(entity_text)
+        if entity_text not in by_label[entity_type]:
+            by_label[entity_type].append(entity_text)
 
-    # Additional structured fields from spaCy NER
-    additional_entities = {
-        "organizations": [],
-        "dates": [],
-        "monetary_values": []
-    }
-
-    # Capture organizations, dates, and monetary values using spaCy
-    for ent in doc.ents:
+        # Capture organizations, dates, and monetary values using spaCy
         if ent.label_ == "ORG":
-            additional_entities["organizations"].append(ent.text)
+            structured["organizations"].append(ent.text)
         elif ent.label_ == "DATE":
-            additional_entities["dates"].append(ent.text)
+            structured["dates"].append(ent.text)
         elif ent.label_ in {"MONEY", "PERCENT"}:
-            additional_entities["monetary_values"].append(ent.text)
+            structured["monetary_values"].append(ent.text)
 
-    extracted_data["additional_entities"].update(additional_entities)
+def _finish(text, extracted_data, state):
+    """Folds the merged entities and catch-all key-value pairs into the result."""
+    extracted_data["additional_entities"].update(state["by_label"])
+    extracted_data["additional_entities"].update(state["structured"])
 
-    # Catch-all pattern for additional unstructured key-value pairs
-    general_data_pattern = re.compile(r"(\b\w+\b(?: \b\w+\b){0,3})\s*:\s*(.+)")
     for match in general_data_pattern.finditer(text):
         key, value = match.groups()
         extracted_data["additional_entities"].setdefault(key.strip(), []).append(value.strip())
 
+    return extracted_data
+
+def extract_property_data(pages, batch_size=NLP_BATCH_SIZE, n_process=NLP_N_PROCESS):
+    """Extracts property details from an iterable of page texts and returns them as a dict."""
+    with timed('pdf.read'):
+        pages = list(pages)
+    text = "".join(pages)
+
+    extracted_data = _new_extracted_data()
+    with timed('extract.patterns'):
+        _extract_patterns(text, extracted_data)
+
+    # Process text with spaCy chunk by chunk to capture additional entities
+    state = _new_entity_state()
+    with timed('nlp'):
+        for doc in get_nlp().pipe(iter_text_chunks(pages), batch_size=batch_size, n_process=n_process):
+            _merge_entities(doc, state)
+
+    return _finish(text, extracted_data, state)
+
+def extract_data_from_pdf(source, batch_size=NLP_BATCH_SIZE, n_process=NLP_N_PROCESS):
+    """Extracts tenant, property, and additional financial details from a PDF file path or its bytes."""
+    extracted_data = extract_property_data(iter_pdf_pages(source), batch_size, n_process)
     return json.dumps(extracted_data, indent=4)
+
+def extract_data_from_pdfs(file_paths, batch_size=NLP_BATCH_SIZE, n_process=NLP_N_PROCESS):
+    """
+    Extracts many PDFs, sharing spaCy batches across documents.
+    Yields (file_path, extracted_data) in input order as each document finishes.
+    """
+    pending = {}
+
+    def chunks():
+        for index, file_path in enumerate(file_paths):
+            pages = list(iter_pdf_pages(file_path))
+            text = "".join(pages)
+            extracted_data = _new_extracted_data()
+            _extract_patterns(text, extracted_data)
+            pending[index] = (file_path, text, extracted_data, _new_entity_state())
+            has_chunks = False
+            for chunk in iter_text_chunks(pages):
+                has_chunks = True
+                yield chunk, index
+            if not has_chunks:
+                # Keep empty documents in the stream so they are still reported
+                yield "", index
+
+    current = None
+    docs = get_nlp().pipe(chunks(), as_tuples=True, batch_size=batch_size, n_process=n_process)
+    for doc, index in docs:
+        if current is not None and index != current:
+            file_path, text, extracted_data, state = pending.pop(current)
+            yield file_path, _finish(text, extracted_data, state)
+        current = index
+        _merge_entities(doc, pending[index][3])
+
+    if current is not None:
+        file_path, text, extracted_data, state = pending.pop(current)
+        yield file_path, _finish(text, extracted_data, state)
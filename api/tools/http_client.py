@@ -0,0 +1,190 @@
+import os
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Defaults for every upstream call (seconds)
+CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '15'))
+MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '3'))
+BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', '0.5'))
+BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', '10'))
+# Requests in flight per upstream host, across all threads of the process
+HOST_CONCURRENCY = int(os.getenv('HTTP_HOST_CONCURRENCY', '8'))
+POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '16'))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_sessions = {}
+_host_slots = {}
+_overrides = {}
+_rate_limiters = {}
+_metrics_hooks = []
+_lock = threading.Lock()
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def set_host_rate_limit(host, rate):
+    """Caps requests to `host` at `rate` per second (None or 0 removes the cap)."""
+    if rate:
+        _rate_limiters[host] = RateLimiter(rate)
+    else:
+        _rate_limiters.pop(host, None)
+
+
+def set_host_override(host, base_url):
+    """Sends requests for `host` to `base_url` instead (e.g. a local stub server)."""
+    _overrides[host] = base_url.rstrip('/')
+
+
+def clear_host_overrides():
+    _overrides.clear()
+
+
+def _load_env_settings():
+    # HTTP_HOST_OVERRIDES="news.google.com=http://127.0.0.1:8001,www.zillow.com=http://127.0.0.1:8001"
+    for item in filter(None, os.getenv('HTTP_HOST_OVERRIDES', '').split(',')):
+        host, _, base_url = item.partition('=')
+        set_host_override(host.strip(), base_url.strip())
+    # HTTP_HOST_RATE_LIMITS="www.zillow.com=1,news.google.com=5" (requests per second)
+    for item in filter(None, os.getenv('HTTP_HOST_RATE_LIMITS', '').split(',')):
+        host, _, rate = item.partition('=')
+        set_host_rate_limit(host.strip(), float(rate))
+
+
+_load_env_settings()
+
+
+def add_metrics_hook(hook):
+    """
+    Registers hook(event) to be called after every attempt. The event dict has
+    method, host, url, status (None on error), elapsed (seconds), attempt and error.
+    """
+    _metrics_hooks.append(hook)
+
+
+def remove_metrics_hook(hook):
+    _metrics_hooks.remove(hook)
+
+
+def _emit(event):
+    for hook in list(_metrics_hooks):
+        try:
+            hook(event)
+        except Exception as e:
+            logging.error(f"HTTP metrics hook failed: {e}")
+
+
+def _resolve(url):
+    """Applies host overrides. Returns (host, url)."""
+    parts = urlsplit(url)
+    host = parts.hostname
+    base_url = _overrides.get(host)
+    if base_url:
+        base = urlsplit(base_url)
+        url = urlunsplit((base.scheme, base.netloc, base.path + parts.path, parts.query, parts.fragment))
+    return host, url
+
+
+def get_session(host):
+    """Returns the keep-alive session for a host, creating it on first use."""
+    session = _sessions.get(host)
+    if session is None:
+        with _lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _sessions[host] = session
+                _host_slots[host] = threading.BoundedSemaphore(HOST_CONCURRENCY)
+    return session
+
+
+def _backoff(attempt, response=None):
+    """Exponential backoff with full jitter; honours a numeric Retry-After header."""
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(BACKOFF_MAX, float(retry_after))
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def request(method, url, timeout=None, retries=MAX_RETRIES, **kwargs):
+    """
+    Sends a request through the pooled session for the URL's host.
+
+    Connection errors, timeouts and retryable statuses (429/5xx) are retried with
+    backoff. The last response is returned even if its status is an error, so callers
+    keep checking status_code as before; the last exception is raised if every attempt failed.
+    """
+    host, url = _resolve(url)
+    session = get_session(host)
+    slots = _host_slots[host]
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+    for attempt in range(retries + 1):
+        limiter = _rate_limiters.get(host)
+        if limiter is not None:
+            limiter.wait()
+        started = time.perf_counter()
+        response = None
+        error = None
+        try:
+            with slots:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+
+        _emit({
+            'method': method,
+            'host': host,
+            'url': url,
+            'status': response.status_code if response is not None else None,
+            'elapsed': time.perf_counter() - started,
+            'attempt': attempt,
+            'error': repr(error) if error else None,
+        })
+
+        retryable = error is not None or response.status_code in RETRY_STATUSES
+        if not retryable or attempt == retries:
+            if error is not None:
+                raise error
+            return response
+
+        delay = _backoff(attempt, response)
+        logging.warning(f"Retrying {method} {url} in {delay:.2f}s "
+                        f"({error or response.status_code}, attempt {attempt + 1}/{retries})")
+        if response is not None:
+            response.close()
+        time.sleep(delay)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
@@ -1,19 +1,16 @@
 import os
 import json
-import requests
 from bs4 import BeautifulSoup
 import logging
-
-# Logging configuration
-logging.basicConfig(
-    filename='scrape.log',
-    filemode='a',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+from api.tools import http_client
+from api.stages import run_stages, stage_pool
+from api.metrics import timed
 
 # Define the data directory path for saving JSON files
-DATA_DIR = os.path.join(os.path.dirname(__file__), '../data')
+DATA_DIR = os.getenv('NEWS_DATA_DIR', os.path.join(os.path.dirname(__file__), '../data'))
+
+# Pool for concurrent category and query scrapes
+news_stages = stage_pool('news', 8)
 
 # Ensure the data directory exists
 if not os.path.exists(DATA_DIR):
@@ -36,31 +33,34 @@ def scrape_google_news(search_query):
     try:
         logging.info(f"Starting scrape for: {search_query}")
         
-        # Construct Google News search URL
-        search_url = f"https://news.google.com/search?q={search_query.replace(' ', '%20')}&hl=en-US&gl=US&ceid=US:en"
+        # Google News search URL; requests encodes the query, including any & or # in it
+        search_url = "https://news.google.com/search"
+        params = {'q': search_query, 'hl': 'en-US', 'gl': 'US', 'ceid': 'US:en'}
         
         # Send a GET request to Google News
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
-        response = requests.get(search_url, headers=headers)
+        with timed('news.fetch'):
+            response = http_client.get(search_url, params=params, headers=headers)
         
         if response.status_code != 200:
             logging.error(f"Failed to fetch data from Google News. Status code: {response.status_code}")
             return {"error": f"Failed to fetch data from Google News. Status code: {response.status_code}"}
         
-        # Parse the page content with BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Scrape headlines and URLs
-        headlines = []
-        for result in soup.select('article'):
-            title_elem = result.find('h3')
-            link_elem = result.find('a', href=True)
-            if title_elem and link_elem:
-                title = title_elem.get_text()
-                url = "https://news.google.com" + link_elem['href'][1:]  # Convert relative URL to absolute
-                headlines.append({'title': title, 'url': url})
+        with timed('news.parse'):
+            # Parse the page content with BeautifulSoup
+            soup = BeautifulSoup(response.text, 'html.parser')
+
+            # Scrape headlines and URLs
+            headlines = []
+            for result in soup.select('article'):
+                title_elem = result.find('h3')
+                link_elem = result.find('a', href=True)
+                if title_elem and link_elem:
+                    title = title_elem.get_text()
+                    url = "https://news.google.com" + link_elem['href'][1:]  # Convert relative URL to absolute
+                    headlines.append({'title': title, 'url': url})
 
         logging.info(f"Found {len(headlines)} headlines for {search_query}.")
         return {'articles': headlines}
@@ -69,18 +69,73 @@ def scrape_google_news(search_query):
         logging.error(f"Error while scraping {search_query}: {e}")
         return {"error": str(e)}
 
+# Search query and snapshot file for each news category
+NEWS_CATEGORIES = {
+    'national': ("National Commercial Real Estate News", 'national_news.json'),
+    'regional': ("Regional Commercial Real Estate News", 'regional_news.json'),
+    'emerging': ("Emerging Commercial Real Estate News", 'emerging_news.json'),
+}
+
+# Custom search queries accepted in one batch request, and the longest query
+MAX_NEWS_QUERIES = int(os.getenv('MAX_NEWS_QUERIES', '10'))
+MAX_NEWS_QUERY_LENGTH = 200
+
+def get_category_news(category):
+    """Scrapes one news category and saves it as that category's snapshot file."""
+    search_query, filename = NEWS_CATEGORIES[category]
+    news_data = scrape_google_news(search_query)
+    # Keep the last good snapshot when a scrape fails
+    if 'error' not in news_data:
+        save_news_to_file(filename, news_data)
+    return news_data
+
+def load_news_snapshot(category):
+    """Returns (news_data, saved_at) from a category's snapshot file, or None if there isn't one."""
+    file_path = os.path.join(DATA_DIR, NEWS_CATEGORIES[category][1])
+    try:
+        with open(file_path) as f:
+            return json.load(f), os.path.getmtime(file_path)
+    except (OSError, ValueError) as e:
+        logging.info(f"No news snapshot for {category}: {e}")
+        return None
+
 # Convenience functions for each type of news
 def get_national_news():
-    news_data = scrape_google_news("National Commercial Real Estate News")
-    save_news_to_file('national_news.json', news_data)
-    return news_data
+    return get_category_news('national')
 
 def get_regional_news():
-    news_data = scrape_google_news("Regional Commercial Real Estate News")
-    save_news_to_file('regional_news.json', news_data)
-    return news_data
+    return get_category_news('regional')
 
 def get_emerging_news():
-    news_data = scrape_google_news("Emerging Commercial Real Estate News")
-    save_news_to_file('emerging_news.json', news_data)
-    return news_data
+    return get_category_news('emerging')
+
+def get_news_batch(categories=(), queries=(), deadline=None, fetch_category=get_category_news):
+    """
+    Fetches several news categories and custom search queries concurrently.
+    Returns each source's payload under 'results' plus one de-duplicated 'articles' list,
+    where every article lists the sources it appeared in. Sources that miss the
+    deadline (seconds) are reported as errors instead of holding up the rest.
+    """
+    stages = {}
+    for category in categories:
+        stages[category] = lambda category=category: fetch_category(category)
+    for query in queries:
+        stages[f"query:{query}"] = lambda query=query: scrape_google_news(query)
+
+    results, errors = run_stages(stages, default_timeout=deadline, pool=news_stages)
+    for name, error in errors.items():
+        results[name] = {"error": error}
+
+    articles = []
+    seen = {}
+    for name in stages:
+        for article in results[name].get('articles', []):
+            key = article.get('url') or article.get('title', '').strip().lower()
+            if key in seen:
+                seen[key]['sources'].append(name)
+                continue
+            merged = dict(article, sources=[name])
+            seen[key] = merged
+            articles.append(merged)
+
+    return {'results': {name: results[name] for name in stages}, 'articles': articles}
@@ -0,0 +1,90 @@
+import os
+import time
+import logging
+import threading
+
+from api.cache import SingleFlight, Refresher
+from api.tools.news import NEWS_CATEGORIES, get_category_news, load_news_snapshot
+
+# Seconds before cached news is considered stale and refreshed in the background
+NEWS_TTL = int(os.getenv('NEWS_TTL', '900'))
+# Seconds before a category whose scrape failed is scraped again
+NEWS_RETRY_AFTER = int(os.getenv('NEWS_RETRY_AFTER', '120'))
+# Seconds between background refreshes of every category (0 disables the refresher)
+NEWS_REFRESH_INTERVAL = int(os.getenv('NEWS_REFRESH_INTERVAL', '600'))
+
+
+class NewsCache:
+    """
+    Stale-while-revalidate cache for news categories.
+
+    Fresh entries are served from memory. Stale entries are still served from memory
+    while one background refresh replaces them. Only a category with no entry at all
+    waits for a scrape, and concurrent requests for it share that one scrape.
+    A failed scrape is retried after `retry_after` seconds rather than on every request.
+    """
+
+    def __init__(self, fetch=get_category_news, ttl=NEWS_TTL, snapshot=load_news_snapshot,
+                 retry_after=NEWS_RETRY_AFTER):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._entries = {}
+        self._flight = SingleFlight()
+        self._refresher = Refresher('news-refresher', self.refresh_all)
+        if snapshot is not None:
+            self.warm_start(snapshot)
+
+    def warm_start(self, snapshot):
+        """Seeds entries from saved snapshots, aged by when they were written."""
+        for category in NEWS_CATEGORIES:
+            saved = snapshot(category)
+            if saved is not None:
+                news_data, saved_at = saved
+                self._entries[category] = (news_data, saved_at)
+
+    def get(self, category):
+        entry = self._entries.get(category)
+        if entry is None:
+            return self._flight.do(category, lambda: self._refresh(category))
+
+        news_data, fetched_at = entry
+        if time.time() - fetched_at > self.ttl and not self._flight.in_flight(category):
+            threading.Thread(target=self.refresh, args=(category,), daemon=True).start()
+        return news_data
+
+    def refresh(self, category):
+        """Scrapes a category now, sharing the scrape with any concurrent caller."""
+        return self._flight.do(category, lambda: self._refresh(category))
+
+    def _refresh(self, category):
+        news_data = self.fetch(category)
+        if 'error' not in news_data:
+            self._entries[category] = (news_data, time.time())
+            return news_data
+
+        # Keep serving the last good data (or the error, if there is none), and date the entry
+        # so it turns stale again after retry_after rather than on the very next request
+        logging.error(f"News refresh failed for {category}: {news_data['error']}")
+        entry = self._entries.get(category)
+        if entry is not None:
+            news_data = entry[0]
+        self._entries[category] = (news_data, time.time() - self.ttl + self.retry_after)
+        return news_data
+
+    def refresh_all(self):
+        for category in NEWS_CATEGORIES:
+            try:
+                self.refresh(category)
+            except Exception as e:
+                logging.error(f"News refresh failed for {category}: {e}")
+
+    def start_refresher(self, interval=NEWS_REFRESH_INTERVAL):
+        """Refreshes every category on a background thread every `interval` seconds."""
+        self._refresher.start(interval)
+
+    def stop_refresher(self):
+        self._refresher.stop()
+
+
+news_cache = NewsCache()
@@ -0,0 +1,52 @@
+import os
+import gc
+import threading
+import logging
+
+# Default spaCy model used for entity recognition
+DEFAULT_MODEL = os.getenv('SPACY_MODEL', 'en_core_web_sm')
+
+# Components that entity recognition doesn't need. The NER component in the
+# en_core_web_* pipelines has its own token-to-vector layer, so dropping these
+# leaves doc.ents unchanged while skipping their load and run time.
+NER_DISABLED = ('parser', 'lemmatizer', 'tagger', 'attribute_ruler')
+
+_models = {}
+_lock = threading.Lock()
+
+
+def get_nlp(name=None, disable=NER_DISABLED):
+    """Returns a spaCy pipeline, loading it on first use and reusing it afterwards."""
+    key = (name or DEFAULT_MODEL, tuple(disable))
+    nlp = _models.get(key)
+    if nlp is not None:
+        return nlp
+
+    with _lock:
+        if key not in _models:
+            import spacy  # Imported here so modules that never run NLP don't pay for it
+
+            logging.info(f"Loading spaCy model {key[0]} (disabled: {', '.join(key[1]) or 'none'})")
+            _models[key] = spacy.load(key[0], disable=list(key[1]))
+        return _models[key]
+
+
+def nlp_loaded(name=None, disable=NER_DISABLED):
+    """True once the pipeline has been loaded in this process."""
+    return (name or DEFAULT_MODEL, tuple(disable)) in _models
+
+
+def loaded_models():
+    """{model name: pipeline version} of every pipeline loaded in this process."""
+    return {name: nlp.meta.get('version') for (name, _), nlp in list(_models.items())}
+
+
+def preload_nlp(name=None, disable=NER_DISABLED):
+    """
+    Loads the model ahead of time in a pre-forking server (e.g. gunicorn --preload).
+    Objects are moved out of the garbage collector's reach afterwards so forked
+    workers don't touch (and copy) the model's pages during collections.
+    """
+    nlp = get_nlp(name, disable)
+    gc.freeze()
+    return nlp
@@ -1,8 +1,20 @@
-import requests
 from bs4 import BeautifulSoup
-
-def fetch_interest_rates():
-    """Scrapes commercial real estate interest rates from public sources."""
+from api.tools import http_client
+
+# Placeholder data used when no source has ever been scraped successfully
+FALLBACK_RATES = [
+    {"source": "SOFR 30 day", "value": "4.840%"},
+    {"source": "Prime", "value": "8.000%"},
+    {"source": "LIBOR 30 day", "value": "0.000%"},
+    {"source": "5 yr Treasury", "value": "3.990%"},
+    {"source": "10 yr Treasury", "value": "3.880%"},
+]
+
+def fetch_interest_rates(fallback=True):
+    """
+    Scrapes commercial real estate interest rates from public sources.
+    When nothing could be scraped, returns the placeholder rates, or [] if fallback is False.
+    """
     
     # URLs for scraping real-time interest rate data
     urls = [
@@ -13,7 +25,7 @@ def fetch_interest_rates():
 
     for url in urls:
         try:
-            response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
+            response = http_client.get(url, headers={"User-Agent": "Mozilla/5.0"})
             if response.status_code != 200:
                 continue  # Try next URL if the response fails
 
@@ -39,13 +51,7 @@ def fetch_interest_rates():
             continue  # Try the next URL if an error occurs
 
     # Fallback to placeholder data if no rates were found
-    if not rates:
-        rates = [
-            {"source": "SOFR 30 day", "value": "4.840%"},
-            {"source": "Prime", "value": "8.000%"},
-            {"source": "LIBOR 30 day", "value": "0.000%"},
-            {"source": "5 yr Treasury", "value": "3.990%"},
-            {"source": "10 yr Treasury", "value": "3.880%"},
-        ]
+    if not rates and fallback:
+        rates = [dict(rate) for rate in FALLBACK_RATES]
 
     return rates
@@ -0,0 +1,188 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+from api.cache import SingleFlight, Refresher
+from api.tools.rates import fetch_interest_rates, FALLBACK_RATES
+
+# Seconds between background scrapes of the rate sources (0 disables the refresher)
+RATES_REFRESH_INTERVAL = int(os.getenv('RATES_REFRESH_INTERVAL', '3600'))
+# Snapshots older than this many seconds are marked stale in responses
+RATES_MAX_AGE = int(os.getenv('RATES_MAX_AGE', str(2 * RATES_REFRESH_INTERVAL or 7200)))
+# SQLite file holding every observed rate; outside the source tree, which may be read-only
+RATES_STORE_PATH = os.getenv('RATES_STORE_PATH', '/tmp/aicre_rates.sqlite3')
+
+
+def parse_rate(value):
+    """'4.840%' -> 4.84; None when the value isn't a number."""
+    try:
+        return float(str(value).replace('%', '').strip())
+    except ValueError:
+        return None
+
+
+class RatesStore:
+    """
+    Append-only time series of rate observations, indexed by source and time.
+    The file is created on first use, not when the store is constructed.
+    """
+
+    def __init__(self, path=RATES_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    self._create()
+                    self._ready = True
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _create(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with sqlite3.connect(self.path, timeout=30) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS observations ('
+                ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+                ' source TEXT NOT NULL,'
+                ' value TEXT NOT NULL,'
+                ' rate REAL,'
+                ' observed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS observations_by_source ON observations (source, observed_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS observations_by_time ON observations (observed_at)')
+
+    def append(self, rates, observed_at=None):
+        """Records one snapshot: every rate shares the same observation time."""
+        observed_at = time.time() if observed_at is None else observed_at
+        conn = self._connect()
+        with self._lock, conn:
+            conn.executemany(
+                'INSERT INTO observations (source, value, rate, observed_at) VALUES (?, ?, ?, ?)',
+                [(r['source'], r['value'], parse_rate(r['value']), observed_at) for r in rates]
+            )
+
+    def latest(self):
+        """The most recent snapshot as (rates, observed_at), or None if nothing was recorded."""
+        with self._connect() as conn:
+            row = conn.execute('SELECT MAX(observed_at) FROM observations').fetchone()
+            if row[0] is None:
+                return None
+            rows = conn.execute(
+                'SELECT source, value FROM observations WHERE observed_at = ? ORDER BY id', (row[0],)
+            ).fetchall()
+        return [{'source': source, 'value': value} for source, value in rows], row[0]
+
+    def history(self, source=None, since=None, until=None, limit=None):
+        """Observations between two timestamps (epoch seconds), oldest first, optionally for one source."""
+        sql = 'SELECT source, value, rate, observed_at FROM observations WHERE 1 = 1'
+        params = []
+        if source is not None:
+            sql += ' AND source = ?'
+            params.append(source)
+        if since is not None:
+            sql += ' AND observed_at >= ?'
+            params.append(since)
+        if until is not None:
+            sql += ' AND observed_at <= ?'
+            params.append(until)
+        sql += ' ORDER BY observed_at, id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [{'source': s, 'value': v, 'rate': r, 'observed_at': t} for s, v, r, t in rows]
+
+
+class RatesFeed:
+    """
+    Latest interest-rate snapshot, kept in memory and refreshed on a background thread.
+
+    Every successful scrape is appended to the history store. When a scrape fails the previous
+    snapshot keeps being served (marked stale once it is older than max_age); the placeholder
+    rates are only used before any scrape has ever succeeded.
+    """
+
+    def __init__(self, fetch=None, store=None, max_age=RATES_MAX_AGE):
+        self.fetch = fetch or (lambda: fetch_interest_rates(fallback=False))
+        self.store = store
+        self.max_age = max_age
+        self._snapshot = None
+        self._loaded = store is None
+        self._attempted = False
+        self._flight = SingleFlight()
+        self._refresher = Refresher('rates-refresher', self.refresh)
+
+    def _load(self):
+        # The recorded snapshot is read on first use, so importing the feed doesn't touch the store
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            saved = self.store.latest()
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Could not read recorded interest rates: {e}")
+            return
+        if self._snapshot is None:
+            self._snapshot = saved
+
+    def get(self):
+        self._load()
+        snapshot = self._snapshot
+        # Only the first request waits for a scrape; after that the refresher keeps retrying
+        if snapshot is None and not self._attempted:
+            snapshot = self.refresh()
+        if snapshot is None:
+            return {'rates': [dict(rate) for rate in FALLBACK_RATES], 'observed_at': None,
+                    'stale': True, 'fallback': True}
+        rates, observed_at = snapshot
+        return {'rates': rates, 'observed_at': observed_at,
+                'stale': time.time() - observed_at > self.max_age, 'fallback': False}
+
+    def refresh(self):
+        """Scrapes now, sharing the scrape with any concurrent caller. Returns the current snapshot."""
+        return self._flight.do('rates', self._refresh)
+
+    def _refresh(self):
+        self._load()
+        self._attempted = True
+        try:
+            rates = self.fetch()
+        except Exception as e:
+            logging.error(f"Interest rate refresh failed: {e}; serving the previous snapshot")
+            return self._snapshot
+        if not rates:
+            logging.error("Interest rate refresh returned no rates; serving the previous snapshot")
+            return self._snapshot
+
+        observed_at = time.time()
+        if self.store is not None:
+            try:
+                self.store.append(rates, observed_at)
+            except (sqlite3.Error, OSError) as e:
+                logging.error(f"Could not record interest rates: {e}")
+        self._snapshot = (rates, observed_at)
+        return self._snapshot
+
+    def history(self, source=None, since=None, until=None, limit=None):
+        if self.store is None:
+            return []
+        return self.store.history(source, since, until, limit)
+
+    def start_refresher(self, interval=RATES_REFRESH_INTERVAL):
+        """Scrapes the rate sources on a background thread every `interval` seconds."""
+        self._refresher.start(interval)
+
+    def stop_refresher(self):
+        self._refresher.stop()
+
+
+rates_feed = RatesFeed(store=RatesStore())
@@ -1,21 +1,86 @@
 import os
-import json
 import logging
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from api.tools import http_client
+from api.cache import TTLCache, SingleFlight
+from api.metrics import timed
+from api.tools.zillow_store import get_store, normalize_address
 
-# Define the path for saved data
+# Legacy JSON array of saved data, migrated into the Zillow store on first use
 DATA_FILE_PATH = os.path.join(os.path.dirname(__file__), 'saved_data.json')
 
-# Set up logging configuration
-logging.basicConfig(
-    filename='scrape.log',
-    filemode='a',
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+
+# Fields read from a Zillow page: the first element with `class` (and, if given, containing
+# `contains`) supplies the value, stripped unless strip is False; 'N/A' when there is none
+FIELD_SPECS = {
+    'price': {'class': 'ds-summary-row'},
+    'address': {'class': 'ds-address-container'},
+    'property_type': {'class': 'ds-home-type'},
+    'property_size': {'class': 'ds-home-fact-list-item'},
+    'zestimate': {'class': 'ds-estimate-value'},
+    'year_built': {'class': 'ds-home-fact-list-item', 'contains': 'Year Built', 'strip': False},
+    'property_taxes': {'class': 'ds-home-fact-list-item', 'contains': 'Property Tax', 'strip': False},
+}
+# Images are the first img tags under this class
+IMAGE_CONTAINER_CLASS = 'media-stream'
+MAX_IMAGES = 5
+
+_SPECS_BY_CLASS = {}
+for _name, _spec in FIELD_SPECS.items():
+    _SPECS_BY_CLASS.setdefault(_spec['class'], []).append((_name, _spec))
+_WANTED_CLASSES = set(_SPECS_BY_CLASS) | {IMAGE_CONTAINER_CLASS}
+
+def _is_wanted_class(css_class):
+    return css_class in _WANTED_CLASSES
+
+# lxml is much faster than the pure-Python html.parser; fall back when it isn't installed
+try:
+    import lxml  # noqa: F401
+    ZILLOW_PARSER = os.getenv('ZILLOW_PARSER', 'lxml')
+except ImportError:
+    ZILLOW_PARSER = os.getenv('ZILLOW_PARSER', 'html.parser')
+ZILLOW_PARSE_ONLY = os.getenv('ZILLOW_PARSE_ONLY', '1') == '1'
+
+# Polite request rate towards Zillow, shared by single and portfolio scrapes (requests per second)
+ZILLOW_RATE_LIMIT = float(os.getenv('ZILLOW_RATE_LIMIT', '2'))
+http_client.set_host_rate_limit('www.zillow.com', ZILLOW_RATE_LIMIT)
+
+# Scrape results cached by normalized address; failed fetches are cached briefly so a
+# blocked upstream isn't hit again on every request
+ZILLOW_CACHE_TTL = int(os.getenv('ZILLOW_CACHE_TTL', '3600'))
+ZILLOW_NEGATIVE_TTL = int(os.getenv('ZILLOW_NEGATIVE_TTL', '300'))
+ZILLOW_CACHE_SIZE = int(os.getenv('ZILLOW_CACHE_SIZE', '4096'))
+
+_cache = TTLCache(maxsize=ZILLOW_CACHE_SIZE, ttl=ZILLOW_CACHE_TTL)
+_flight = SingleFlight()
+_negative_results = 0
 
 def scrape_zillow_data(user_input):
+    """
+    Returns Zillow data for an address, neighborhood, city, or zip code, from the cache when possible.
+    Concurrent requests for the same address share one scrape.
+    """
+    key = normalize_address(user_input)
+    cached = _cache.get(key)
+    if cached is None:
+        cached = _flight.do(key, lambda: _scrape_and_cache(key, user_input))
+    return dict(cached)
+
+def _scrape_and_cache(key, user_input):
+    global _negative_results
+    property_data = scrape_zillow_page(user_input)
+    if 'status_code' in property_data:
+        _negative_results += 1
+        _cache.set(key, property_data, ZILLOW_NEGATIVE_TTL)
+    elif 'error' not in property_data:
+        _cache.set(key, property_data)
+    return property_data
+
+def zillow_cache_stats():
+    """Hit/miss/stale counters of the Zillow scrape cache."""
+    return {**_cache.stats(), 'negative': _negative_results}
+
+def scrape_zillow_page(user_input):
     """
     This function takes in an address, neighborhood, city, or zip code and scrapes Zillow data using BeautifulSoup.
     """
@@ -30,88 +95,97 @@ def scrape_zillow_data(user_input):
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
-        response = requests.get(zillow_url, headers=headers)
+        with timed('zillow.fetch'):
+            response = http_client.get(zillow_url, headers=headers)
         
         if response.status_code != 200:
             logging.error(f"Failed to fetch data from Zillow. Status code: {response.status_code}")
-            return {"error": f"Failed to fetch data from Zillow. Status code: {response.status_code}"}
-
-        # Parse the page using BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Scrape property data
-        price = soup.select_one('.ds-summary-row').text.strip() if soup.select_one('.ds-summary-row') else 'N/A'
-        address_details = soup.select_one('.ds-address-container').text.strip() if soup.select_one('.ds-address-container') else 'N/A'
-        property_type = soup.select_one('.ds-home-type').text.strip() if soup.select_one('.ds-home-type') else 'N/A'
-        property_size = soup.select_one('.ds-home-fact-list-item').text.strip() if soup.select_one('.ds-home-fact-list-item') else 'N/A'
-
-        logging.info(f"Scraped data - Price: {price}, Address: {address_details}, Type: {property_type}, Size: {property_size}")
-
-        # Scrape additional property data (optional)
-        zestimate = soup.select_one('.ds-estimate-value').text.strip() if soup.select_one('.ds-estimate-value') else 'N/A'
-        year_built = next((item.text for item in soup.select('.ds-home-fact-list-item') if 'Year Built' in item.text), 'N/A')
-        property_taxes = next((item.text for item in soup.select('.ds-home-fact-list-item') if 'Property Tax' in item.text), 'N/A')
+            return {
+                "error": f"Failed to fetch data from Zillow. Status code: {response.status_code}",
+                "status_code": response.status_code
+            }
 
-        logging.info(f"Scraped additional data - Zestimate: {zestimate}, Year Built: {year_built}, Taxes: {property_taxes}")
+        # Parse the page in one pass over the relevant subtrees
+        with timed('zillow.parse'):
+            fields = parse_zillow_page(response.text)
 
-        # Scrape property images
-        image_tags = soup.select('.media-stream img')[:5]  # Get up to 5 images
-        images = [img['src'] for img in image_tags if img.get('src')]
-
-        logging.info(f"Scraped {len(images)} images")
+        logging.info(f"Scraped data - Price: {fields['price']}, Address: {fields['address']}, "
+                     f"Type: {fields['property_type']}, Size: {fields['property_size']}")
+        logging.info(f"Scraped additional data - Zestimate: {fields['zestimate']}, "
+                     f"Year Built: {fields['year_built']}, Taxes: {fields['property_taxes']}")
+        logging.info(f"Scraped {len(fields['images'])} images")
 
         # Historical Data URL (Zillow Data Research)
         historical_data_url = get_historical_data_url(user_input)
 
-        # Save data to JSON
-        property_data = {
-            'price': price,
-            'address': address_details,
-            'property_type': property_type,
-            'property_size': property_size,
-            'zestimate': zestimate,
-            'year_built': year_built,
-            'property_taxes': property_taxes,
-            'images': images,
-            'historical_data_url': historical_data_url
-        }
-        save_to_json(property_data)
+        # Save data to the store
+        property_data = {**fields, 'historical_data_url': historical_data_url}
+        with timed('zillow.store'):
+            save_property_data(user_input, property_data)
 
-        logging.info(f"Data saved to JSON for input: {user_input}")
+        logging.info(f"Data saved for input: {user_input}")
         return property_data
 
     except Exception as e:
         logging.error(f"Error occurred while scraping {user_input}: {e}")
         return {'error': str(e)}
 
-def save_to_json(data):
+def parse_zillow_page(html, parser=None, parse_only=ZILLOW_PARSE_ONLY):
+    """
+    Extracts FIELD_SPECS and up to 5 image URLs from a Zillow page in a single walk of the DOM.
+    With parse_only, the parser keeps just the subtrees carrying the classes we read.
     """
-    Function to save scraped data into a JSON file.
-    It appends the new data to the existing array in 'saved_data.json'.
+    soup = BeautifulSoup(
+        html,
+        parser or ZILLOW_PARSER,
+        parse_only=SoupStrainer(class_=_is_wanted_class) if parse_only else None
+    )
+
+    fields = {}
+    images = []
+    seen_images = set()
+    for element in soup.find_all(class_=True):
+        for css_class in element.get('class', ()):
+            if css_class == IMAGE_CONTAINER_CLASS and len(images) < MAX_IMAGES:
+                for img in element.find_all('img'):
+                    if len(images) == MAX_IMAGES:
+                        break
+                    if id(img) not in seen_images:
+                        seen_images.add(id(img))
+                        images.append(img)
+
+            text = None
+            for name, spec in _SPECS_BY_CLASS.get(css_class, ()):
+                if name in fields:
+                    continue
+                if text is None:
+                    text = element.text
+                if 'contains' in spec and spec['contains'] not in text:
+                    continue
+                fields[name] = text.strip() if spec.get('strip', True) else text
+
+    result = {name: fields.get(name, 'N/A') for name in FIELD_SPECS}
+    result['images'] = [img['src'] for img in images if img.get('src')]
+    return result
+
+def save_property_data(user_input, data):
+    """
+    Function to save scraped data into the append-only Zillow store, indexed by address.
     """
     try:
-        if os.path.exists(DATA_FILE_PATH):
-            with open(DATA_FILE_PATH, 'r+') as file:
-                try:
-                    data_array = json.load(file)
-                except json.JSONDecodeError:
-                    data_array = []
-
-                # Append new data
-                data_array.append(data)
-
-                # Move the file pointer to the beginning of the file to overwrite
-                file.seek(0)
-                json.dump(data_array, file, indent=4)
-        else:
-            with open(DATA_FILE_PATH, 'w') as file:
-                # Create a new file and write the first entry
-                json.dump([data], file, indent=4)
-
-        logging.info("Data successfully saved to JSON")
+        get_store(DATA_FILE_PATH).append(user_input, data)
+        logging.info("Data successfully saved to store")
 
     except Exception as e:
-        logging.error(f"Error saving data to JSON: {e}")
+        logging.error(f"Error saving data to store: {e}")
+
+def get_latest_property_data(user_input):
+    """Most recent saved scrape for an address, or None."""
+    return get_store(DATA_FILE_PATH).latest(user_input)
+
+def get_property_history(user_input, since=None, until=None):
+    """Saved scrapes for an address between two epoch timestamps, oldest first."""
+    return get_store(DATA_FILE_PATH).history(user_input, since, until)
 
 def get_historical_data_url(user_input):
     """
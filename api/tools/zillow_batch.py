@@ -0,0 +1,112 @@
+import os
+import csv
+import io
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from api.tools.zillow import scrape_zillow_data, get_latest_property_data
+from api.tools.zillow_store import normalize_address
+
+# Concurrent scrapes per portfolio; the Zillow host rate limit still applies on top
+PORTFOLIO_WORKERS = int(os.getenv('ZILLOW_PORTFOLIO_WORKERS', '4'))
+# Where portfolio checkpoints are kept
+CHECKPOINT_DIR = os.getenv('ZILLOW_CHECKPOINT_DIR', '/tmp/aicre_zillow_checkpoints')
+# Most addresses accepted in one portfolio
+MAX_PORTFOLIO_SIZE = int(os.getenv('ZILLOW_MAX_PORTFOLIO_SIZE', '1000'))
+
+
+def parse_address_csv(text):
+    """Reads addresses from CSV text: the 'address' column if there is a header with one, else the first column."""
+    rows = [row for row in csv.reader(io.StringIO(text)) if row and row[0].strip()]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    if 'address' in header:
+        column = header.index('address')
+        return [row[column].strip() for row in rows[1:] if len(row) > column and row[column].strip()]
+    return [row[0].strip() for row in rows]
+
+
+def validate_addresses(addresses, max_size=MAX_PORTFOLIO_SIZE):
+    """Raises ValueError unless `addresses` is a list of at most max_size non-empty strings."""
+    if not isinstance(addresses, list) or not all(isinstance(a, str) and a.strip() for a in addresses):
+        raise ValueError("Addresses must be a list of non-empty strings")
+    if len(addresses) > max_size:
+        raise ValueError(f"At most {max_size} addresses per portfolio")
+
+
+class Checkpoint:
+    """JSON Lines file of addresses already scraped in a portfolio run."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        self.done.add(json.loads(line)['address_key'])
+                    except (ValueError, KeyError):
+                        continue  # Partially written last line of an interrupted run
+
+    def record(self, address_key):
+        with self._lock, open(self.path, 'a') as f:
+            f.write(json.dumps({'address_key': address_key}) + '\n')
+        self.done.add(address_key)
+
+
+def checkpoint_path(checkpoint_id):
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    return os.path.join(CHECKPOINT_DIR, f"{checkpoint_id}.jsonl")
+
+
+def scrape_portfolio(addresses, checkpoint=None, max_workers=PORTFOLIO_WORKERS):
+    """
+    Scrapes many addresses concurrently and yields one result dict per address as each completes.
+
+    Duplicate addresses (after normalization) are scraped once. With a checkpoint, addresses
+    finished by an earlier run are not scraped again; their saved data is yielded instead,
+    marked 'resumed'. The final item is a summary of the run. Raises ValueError for more
+    than MAX_PORTFOLIO_SIZE addresses.
+    """
+    validate_addresses(addresses)
+    unique = {}
+    for address in addresses:
+        unique.setdefault(normalize_address(address), address)
+
+    summary = {'total': len(unique), 'scraped': 0, 'resumed': 0, 'failed': 0}
+    pending = {}
+    for address_key, address in unique.items():
+        if checkpoint is not None and address_key in checkpoint.done:
+            saved = get_latest_property_data(address)
+            summary['resumed'] += 1
+            yield {'address': address, 'resumed': True, 'data': saved['data'] if saved else None}
+        else:
+            pending[address_key] = address
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='portfolio') as executor:
+        futures = {executor.submit(scrape_zillow_data, address): key for key, address in pending.items()}
+        try:
+            for future in as_completed(futures):
+                address_key = futures[future]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    logging.error(f"Portfolio scrape failed for {pending[address_key]}: {e}")
+                    data = {'error': str(e)}
+
+                ok = 'error' not in data
+                summary['scraped' if ok else 'failed'] += 1
+                # Failures aren't checkpointed, so a resumed run tries them again
+                if checkpoint is not None and ok:
+                    checkpoint.record(address_key)
+                yield {'address': pending[address_key], 'resumed': False, 'data': data}
+        finally:
+            # The consumer went away (e.g. the client disconnected): drop scrapes not yet started
+            for future in futures:
+                future.cancel()
+
+    yield {'summary': summary}
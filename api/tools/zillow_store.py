@@ -0,0 +1,142 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+# SQLite file holding every scraped Zillow record; outside the source tree, which may be read-only
+STORE_PATH = os.getenv('ZILLOW_STORE_PATH', '/tmp/aicre_zillow.sqlite3')
+
+# Spelled-out street words mapped to the USPS abbreviations used in the address key
+_ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'drive': 'dr', 'boulevard': 'blvd',
+    'lane': 'ln', 'court': 'ct', 'place': 'pl', 'terrace': 'ter', 'parkway': 'pkwy',
+    'highway': 'hwy', 'circle': 'cir', 'suite': 'ste', 'apartment': 'apt',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+}
+
+
+def normalize_address(address):
+    """Canonical key for an address: lowercase, no punctuation, single spaces, abbreviated street words."""
+    words = re.sub(r"[^\w\s]", " ", address.lower()).split()
+    return " ".join(_ADDRESS_ABBREVIATIONS.get(word, word) for word in words)
+
+
+class ZillowStore:
+    """
+    Append-only store of scraped Zillow records, indexed by normalized address and time.
+
+    Appends are single INSERTs, so they cost the same however many records exist.
+    SQLite serializes writers across processes; WAL mode keeps readers from blocking them.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS records ('
+                ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+                ' address_key TEXT NOT NULL,'
+                ' query TEXT,'
+                ' scraped_at REAL NOT NULL,'
+                ' data TEXT NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS records_by_address ON records (address_key, scraped_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS records_by_time ON records (scraped_at)')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def append(self, address, data, scraped_at=None):
+        """Records one scrape of `address`."""
+        scraped_at = time.time() if scraped_at is None else scraped_at
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                'INSERT INTO records (address_key, query, scraped_at, data) VALUES (?, ?, ?, ?)',
+                (normalize_address(address), address, scraped_at, json.dumps(data))
+            )
+
+    def latest(self, address):
+        """Most recent record for an address, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT query, scraped_at, data FROM records WHERE address_key = ?'
+                ' ORDER BY scraped_at DESC, id DESC LIMIT 1',
+                (normalize_address(address),)
+            ).fetchone()
+        return self._row_to_record(row) if row else None
+
+    def history(self, address, since=None, until=None, limit=None):
+        """Records for an address between two timestamps (epoch seconds), oldest first."""
+        sql = 'SELECT query, scraped_at, data FROM records WHERE address_key = ?'
+        params = [normalize_address(address)]
+        if since is not None:
+            sql += ' AND scraped_at >= ?'
+            params.append(since)
+        if until is not None:
+            sql += ' AND scraped_at <= ?'
+            params.append(until)
+        sql += ' ORDER BY scraped_at, id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    def _row_to_record(self, row):
+        query, scraped_at, data = row
+        return {'address': query, 'scraped_at': scraped_at, 'data': json.loads(data)}
+
+    def migrate_json(self, json_path):
+        """
+        One-time import of the old saved_data.json array. Records are keyed by their scraped
+        address and stamped with the file's modification time, since they carry neither the
+        query nor a timestamp. The file is renamed to *.migrated afterwards.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        with self._lock, self._connect() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_json'").fetchone():
+                return 0
+            with open(json_path) as f:
+                content = f.read()
+            try:
+                # The old writer never truncated the file, so parse the leading array and ignore any tail
+                records, _ = json.JSONDecoder().raw_decode(content.lstrip())
+            except ValueError as e:
+                logging.error(f"Could not parse {json_path} for migration: {e}")
+                return 0
+            scraped_at = os.path.getmtime(json_path)
+            conn.executemany(
+                'INSERT INTO records (address_key, query, scraped_at, data) VALUES (?, ?, ?, ?)',
+                [(normalize_address(r.get('address', '')), r.get('address'), scraped_at, json.dumps(r))
+                 for r in records if isinstance(r, dict)]
+            )
+            conn.execute("INSERT INTO meta VALUES ('migrated_json', ?)", (json_path,))
+        os.replace(json_path, json_path + '.migrated')
+        logging.info(f"Migrated {len(records)} Zillow records from {json_path}")
+        return len(records)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(legacy_json_path=None):
+    """Shared store for the process, migrating the legacy JSON file on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = ZillowStore()
+                if legacy_json_path:
+                    store.migrate_json(legacy_json_path)
+                _store = store
+    return _store
@@ -0,0 +1,6 @@
+import logging
+
+# Zonda development trends aren't integrated yet; reports show this source as unavailable
+def get_zonda_data(address: str):
+    logging.error(f"Zonda data requested for {address}, but no Zonda integration is configured")
+    return {"error": "Zonda integration is not configured"}
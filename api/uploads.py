@@ -0,0 +1,121 @@
+import os
+import hashlib
+import tempfile
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# Largest accepted upload (bytes); larger requests are rejected with 413
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(50 * 1024 * 1024)))
+# Room for multipart headers and form fields on top of the file itself
+MAX_REQUEST_BYTES = MAX_UPLOAD_BYTES + 64 * 1024
+# Uploads up to this size are buffered in memory; larger ones spill to an anonymous temporary file,
+# so a queued document job holds a file handle rather than the document's bytes
+SPOOL_MAX_MEMORY = int(os.getenv('UPLOAD_SPOOL_MAX_MEMORY', str(1024 * 1024)))
+READ_CHUNK_BYTES = 1024 * 1024
+
+PDF = 'application/pdf'
+# Accepted document types; anything else is rejected with 415
+TEXT_TYPES = {'.csv': 'text/csv', '.json': 'application/json', '.txt': 'text/plain'}
+ALLOWED_TYPES = {PDF, *TEXT_TYPES.values()}
+
+
+class HashingSpool:
+    """
+    Write-once buffer for an upload: hashes and counts bytes as they are written, keeps them
+    in memory up to SPOOL_MAX_MEMORY and stops the request once it passes max_bytes.
+    """
+
+    def __init__(self, max_bytes=MAX_UPLOAD_BYTES, max_memory=SPOOL_MAX_MEMORY):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_memory, mode='w+b')
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise RequestEntityTooLarge(f"Uploads are limited to {self.max_bytes} bytes")
+        self._digest.update(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+    def detach(self):
+        """Hands the buffered file over to the caller; closing the spool afterwards leaves it open."""
+        file, self._file = self._file, None
+        return file
+
+    def close(self):
+        # The request closes its file parts when it ends, which must not close a detached file
+        if self._file is not None:
+            self._file.close()
+
+    def __getattr__(self, name):
+        # read/readline/seek/tell/close for werkzeug's form parser
+        return getattr(self._file, name)
+
+
+class UploadRequest(Request):
+    """Request whose multipart file parts are streamed straight into a HashingSpool."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingSpool()
+
+
+def spool_stream(stream, max_bytes=MAX_UPLOAD_BYTES):
+    """Copies a raw request body into a HashingSpool, chunk by chunk."""
+    spool = HashingSpool(max_bytes)
+    for chunk in iter(lambda: stream.read(READ_CHUNK_BYTES), b''):
+        spool.write(chunk)
+    return spool
+
+
+def sniff_content_type(head, filename):
+    """Content type from the file's leading bytes, falling back to its extension for text files."""
+    if head.startswith(b'%PDF-'):
+        return PDF
+    extension = os.path.splitext(filename or '')[1].lower()
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # The head may end part-way through a multi-byte character
+        if e.start < len(head) - 3:
+            return 'application/octet-stream'
+    return TEXT_TYPES.get(extension, 'text/plain')
+
+
+class Upload:
+    """
+    An uploaded document: its spooled file, size, SHA-256 and sniffed type. The bytes stay in
+    the spool until read(), so an upload waiting in the job queue doesn't hold them in memory.
+    Whoever ends up with the upload closes it.
+    """
+
+    def __init__(self, filename, file, size, sha256, content_type):
+        self.filename = filename
+        self.file = file
+        self.size = size
+        self.sha256 = sha256
+        self.content_type = content_type
+
+    @classmethod
+    def from_spool(cls, filename, spool):
+        file = spool.detach()
+        file.seek(0)
+        head = file.read(4096)
+        return cls(filename, file, spool.size, spool.sha256, sniff_content_type(head, filename))
+
+    @property
+    def is_pdf(self):
+        return self.content_type == PDF
+
+    def read(self):
+        """The uploaded bytes, read from the spool."""
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self):
+        self.file.close()
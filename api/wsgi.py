@@ -0,0 +1,13 @@
+"""
+WSGI entry point for production servers:
+
+    gunicorn -c gunicorn.conf.py api.wsgi:app
+"""
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.index import app, start_background_tasks, stop_background_tasks  # noqa: E402
+
+__all__ = ['app', 'start_background_tasks', 'stop_background_tasks']
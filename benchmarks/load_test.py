@@ -0,0 +1,181 @@
+"""
+Load test of the API against stubbed upstreams: the Flask development server (how
+`python api/index.py` used to run in production, debug reloader included) against gunicorn
+with gunicorn.conf.py.
+
+Each mode is started in its own process with every upstream pointed at benchmarks/stub_server.py.
+Concurrent clients then send a mix of requests for a fixed time:
+
+- Zillow scrapes of distinct addresses, so every one goes upstream.
+- Census lookups, which go upstream.
+- News and interest rates, which are served from memory.
+
+Throughput and latency percentiles are printed for each mode. Firebase isn't needed; document
+uploads aren't part of the mix.
+
+Usage: python benchmarks/load_test.py [--modes dev,gunicorn] [--clients 32] [--duration 20]
+                                      [--latency 0.05] [--workers 4] [--threads 8]
+"""
+import os
+import sys
+import time
+import shutil
+import signal
+import argparse
+import tempfile
+import itertools
+import threading
+import subprocess
+
+import requests
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from benchmarks.stub_server import host_overrides  # noqa: E402
+
+STUB_PORT = 8001
+APP_PORT = 5399
+
+_addresses = itertools.count()
+
+
+def request_mix(base_url):
+    """Endpoints in the proportions they're called; Zillow addresses never repeat."""
+    return [
+        lambda: f"{base_url}/api/zillow?address={next(_addresses)} Load Test Ave",
+        lambda: f"{base_url}/api/zillow?address={next(_addresses)} Load Test Ave",
+        lambda: f"{base_url}/census?region={next(_addresses) % 56 + 1:02d}",
+        lambda: f"{base_url}/api/news/national",
+        lambda: f"{base_url}/api/interest-rates",
+    ]
+
+
+def app_env(workdir, args):
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': ROOT,
+        'HTTP_HOST_OVERRIDES': host_overrides(f"http://127.0.0.1:{STUB_PORT}"),
+        'ZILLOW_RATE_LIMIT': '0',
+        'ZILLOW_STORE_PATH': os.path.join(workdir, 'zillow.sqlite3'),
+        'RATES_STORE_PATH': os.path.join(workdir, 'rates.sqlite3'),
+        'CENSUS_STORE_DIR': os.path.join(workdir, 'census'),
+        'NEWS_DATA_DIR': os.path.join(workdir, 'news'),
+        'JOB_STORE': 'memory',
+        'DOCUMENT_CACHE': 'sqlite',
+        'DOCUMENT_CACHE_PATH': os.path.join(workdir, 'documents.sqlite3'),
+        'PRELOAD_NLP': '0',
+        'READYZ_CHECK_FIREBASE': '0',
+        'PORT': str(APP_PORT),
+        'GUNICORN_WORKERS': str(args.workers),
+        'GUNICORN_THREADS': str(args.threads),
+        'GUNICORN_ACCESSLOG': '',
+    })
+    return env
+
+
+def start_app(mode, workdir, args):
+    env = app_env(workdir, args)
+    if mode == 'dev':
+        env['FLASK_DEBUG'] = '1'
+        command = [sys.executable, os.path.join(ROOT, 'api', 'index.py')]
+    else:
+        command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'), 'api.wsgi:app']
+    # Run from the scratch directory so the scrapers' relative scrape.log lands there
+    return subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def wait_ready(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/healthz", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise SystemExit(f"Server at {base_url} did not become healthy")
+
+
+def stop(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def run_clients(base_url, clients, duration):
+    mix = request_mix(base_url)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(offset):
+        session = requests.Session()
+        for i in itertools.count(offset):
+            if time.monotonic() >= stop_at:
+                return
+            url = mix[i % len(mix)]()
+            started = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=30).status_code < 500
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - started
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='dev,gunicorn')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--latency', type=float, default=0.05, help='stub upstream latency (seconds)')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    stub = subprocess.Popen([sys.executable, os.path.join(ROOT, 'benchmarks', 'stub_server.py'),
+                             '--port', str(STUB_PORT), '--latency', str(args.latency)], start_new_session=True)
+    base_url = f"http://127.0.0.1:{APP_PORT}"
+    print(f"{args.clients} clients, {args.duration:.0f}s per mode, upstream latency {args.latency * 1000:.0f}ms")
+    print(f"{'mode':<10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    try:
+        for mode in args.modes.split(','):
+            workdir = tempfile.mkdtemp(prefix=f"aicre_load_{mode}_")
+            app = start_app(mode, workdir, args)
+            try:
+                wait_ready(base_url)
+                latencies, errors, elapsed = run_clients(base_url, args.clients, args.duration)
+            finally:
+                stop(app)
+                shutil.rmtree(workdir, ignore_errors=True)
+            print(f"{mode:<10} {len(latencies):>9} {errors:>7} {len(latencies) / elapsed:>8.1f} "
+                  f"{percentile(latencies, 0.5) * 1000:>9.1f} {percentile(latencies, 0.95) * 1000:>9.1f} "
+                  f"{percentile(latencies, 0.99) * 1000:>9.1f}")
+    finally:
+        stop(stub)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Compares keyword extraction on synthetic rent-roll text: one re.search per
+keyword_dict pattern (the previous approach) against match_keywords' single scan.
+
+Both sides also run the tenant and catch-all passes so the totals reflect the
+whole regex stage of extract_data_from_pdf. Outputs are checked for equality.
+
+Usage: python benchmarks/regex_extraction.py [--sizes 10K,100K,1M,10M,50M] [--runs N]
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.tools.extract_property_data import (
+    keyword_dict, match_keywords, tenant_pattern, general_data_pattern
+)
+
+TENANTS = ['Acme Retail', 'Blue Sky Cafe', 'Zenith Dental', 'Main Street Books', 'Omni Fitness', 'Harbor Freight']
+STATUSES = ['Open credit', 'Unpaid rent', 'Paid rent', 'Prepaid cam', 'Late charge', 'Shortpaid cam']
+SUMMARY = [
+    'Property: Brickyard Plaza, 1140 E Brickyard Rd',
+    'Occupancy rate: 94%',
+    'Square footage: 215,000',
+    'NOI: $1,250,000',
+    'Annual rent: $2,400,000',
+    'Property tax: $180,000',
+    'Vacancy rate: 6%',
+]
+
+
+def rent_roll_text(size, seed=7):
+    """Builds roughly `size` characters of rent-roll-like text with summary lines spread through it."""
+    rng = random.Random(seed)
+    lines = []
+    length = 0
+    while length < size:
+        line = (f"{rng.choice(TENANTS)} ${rng.randint(100, 99999):,}.{rng.randint(0, 99):02d} "
+                f"{rng.choice(STATUSES)}\nUnit {rng.randint(1, 999)} note: lease renewed {rng.randint(1, 12)}/1/2024\n")
+        lines.append(line)
+        length += len(line)
+    step = max(1, len(lines) // (len(SUMMARY) + 1))
+    for i, summary in enumerate(SUMMARY):
+        lines.insert((i + 1) * step, summary + "\n")
+    return "".join(lines)
+
+
+def _value(match):
+    return (match.group(match.re.groups) if match.re.groups else match.group(0)).strip()
+
+
+def per_pattern(text):
+    details = {}
+    for key, pattern in keyword_dict.items():
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            details[key] = _value(match)
+    tenants = [m.groups() for m in tenant_pattern.finditer(text)]
+    general = [m.groups() for m in general_data_pattern.finditer(text)]
+    return details, tenants, general
+
+
+def single_scan(text):
+    details = {key: _value(match) for key, match in match_keywords(text).items()}
+    tenants = [m.groups() for m in tenant_pattern.finditer(text)]
+    general = [m.groups() for m in general_data_pattern.finditer(text)]
+    return details, tenants, general
+
+
+def keywords_only(fn, text):
+    if fn is per_pattern:
+        return {k: re.search(p, text, re.IGNORECASE) for k, p in keyword_dict.items()}
+    return match_keywords(text)
+
+
+def best_of(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def parse_size(value):
+    units = {'K': 1_000, 'M': 1_000_000}
+    value = value.strip().upper()
+    if value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10K,100K,1M,10M,50M')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'keywords old (s)':>17} {'keywords new (s)':>17} {'speedup':>8} "
+          f"{'total old (s)':>14} {'total new (s)':>14} {'speedup':>8}")
+    for size in [parse_size(s) for s in args.sizes.split(',')]:
+        text = rent_roll_text(size)
+        if per_pattern(text) != single_scan(text):
+            raise SystemExit(f"Output mismatch at {size} characters")
+
+        kw_old = best_of(lambda: keywords_only(per_pattern, text), args.runs)
+        kw_new = best_of(lambda: keywords_only(single_scan, text), args.runs)
+        total_old = best_of(lambda: per_pattern(text), args.runs)
+        total_new = best_of(lambda: single_scan(text), args.runs)
+        print(f"{len(text):>8} {kw_old:>17.4f} {kw_new:>17.4f} {kw_old / kw_new:>7.1f}x "
+              f"{total_old:>14.4f} {total_new:>14.4f} {total_old / total_new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
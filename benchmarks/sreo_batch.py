@@ -0,0 +1,101 @@
+"""
+Compares SREO scoring of synthetic portfolios: the per-property scalar computation
+generate_aicre_report does (dict lookups and string parsing) against score_properties'
+vectorized join and columns. Scores are checked for equality.
+
+Usage: python benchmarks/sreo_batch.py [--sizes 1K,10K,100K,1M] [--regions N] [--runs N]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.algos.aicre_report import _to_float
+from api.algos.sreo import score_properties, sreo_index, DEFAULT_HOUSING_STOCK, DEFAULT_POPULATION_GROWTH
+
+
+def portfolio(size, region_count, seed=7):
+    """Properties with string trends like '3.5%', plus region figures with some gaps."""
+    rng = random.Random(seed)
+    region_ids = [f"{i:05d}" for i in range(region_count)]
+    properties = pd.DataFrame({
+        'address': [f"{i} Main St" for i in range(size)],
+        'region': [rng.choice(region_ids) for _ in range(size)],
+        'trend': [f"{rng.uniform(-5, 10):.2f}%" for _ in range(size)],
+    })
+    regions = pd.DataFrame({
+        'region': region_ids,
+        'gdp': [f"{rng.uniform(-1, 5):.2f}" for _ in region_ids],
+        'housing_stock': [rng.choice([None, rng.randint(1000, 500000)]) for _ in region_ids],
+        'population_growth': [rng.uniform(-0.01, 0.05) for _ in region_ids],
+    })
+    return properties, regions
+
+
+def scalar_scores(properties, regions):
+    """One property at a time, the way generate_aicre_report computes a single index."""
+    census = {}
+    for row in regions.to_dict(orient='records'):
+        census[row['region']] = {
+            'gdp': row['gdp'],
+            'housing': {'stock': row['housing_stock']} if pd.notna(row['housing_stock']) else {},
+            'population': {'growth': row['population_growth']},
+        }
+    scores = []
+    for row in properties.to_dict(orient='records'):
+        data = census.get(row['region'], {})
+        scores.append(sreo_index(
+            _to_float(row['trend']) / 100,
+            _to_float(data.get('gdp')) / 100,
+            data.get('population', {}).get('growth', DEFAULT_POPULATION_GROWTH),
+            data.get('housing', {}).get('stock', DEFAULT_HOUSING_STOCK),
+        ))
+    return np.array(scores)
+
+
+def best_of(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def parse_size(value):
+    units = {'K': 1_000, 'M': 1_000_000}
+    value = value.strip().upper()
+    if value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1K,10K,100K,1M')
+    parser.add_argument('--regions', type=int, default=3000)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'properties':>10} {'scalar (s)':>11} {'vectorized (s)':>15} {'speedup':>8}")
+    for size in [parse_size(s) for s in args.sizes.split(',')]:
+        properties, regions = portfolio(size, args.regions)
+        scored = score_properties(properties, regions)
+        expected = scalar_scores(properties, regions)
+        actual = scored.sort_values('address', key=lambda s: s.str.split().str[0].astype(int))['sreo_index']
+        if not np.allclose(actual.to_numpy(), expected):
+            raise SystemExit(f"Score mismatch at {size} properties")
+
+        scalar = best_of(lambda: scalar_scores(properties, regions), args.runs)
+        vectorized = best_of(lambda: score_properties(properties, regions), args.runs)
+        print(f"{size:>10} {scalar:>11.3f} {vectorized:>15.3f} {scalar / vectorized:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
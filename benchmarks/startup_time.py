@@ -0,0 +1,67 @@
+"""
+Measures cold-start cost of the extraction module.
+
+Each measurement runs in a fresh interpreter so nothing is cached between runs:
+  - import:        `import api.tools.extract_property_data` (what every request path pays)
+  - import+model:  the same import plus loading the spaCy model, which is what the
+                   import cost before the model was loaded lazily
+  - full pipeline: loading the model with no components disabled, for comparison
+
+Usage: python benchmarks/startup_time.py [--runs N]
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+SNIPPETS = {
+    'import': "import api.tools.extract_property_data",
+    'import+model': (
+        "import api.tools.extract_property_data\n"
+        "from api.tools.nlp import get_nlp\n"
+        "get_nlp()"
+    ),
+    'full pipeline': (
+        "import api.tools.extract_property_data\n"
+        "from api.tools.nlp import get_nlp\n"
+        "get_nlp(disable=())"
+    ),
+}
+
+TIMER = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "{code}\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def measure(code, runs):
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, '-c', TIMER.format(code=code)],
+            cwd=ROOT,
+            text=True
+        )
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'case':<15} {'median (ms)':>12} {'min (ms)':>10} {'max (ms)':>10}")
+    for name, code in SNIPPETS.items():
+        timings = measure(code, args.runs)
+        print(f"{name:<15} {statistics.median(timings) * 1000:>12.1f} "
+              f"{min(timings) * 1000:>10.1f} {max(timings) * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Local stand-in for the upstreams the API scrapes (Zillow, Google News, the Census API and the
+interest-rate page), with a fixed artificial latency per response.
+
+Point the API at it with http_client's host overrides:
+
+    python benchmarks/stub_server.py --port 8001 --latency 0.05
+    HTTP_HOST_OVERRIDES=www.zillow.com=http://127.0.0.1:8001,news.google.com=http://127.0.0.1:8001,\
+api.census.gov=http://127.0.0.1:8001,www.commercialloandirect.com=http://127.0.0.1:8001 python api/index.py
+
+Responses are chosen by path and served from benchmarks/fixtures: /homes/ (zillow/listing.html),
+/search (news/search.html), /data/ (the requested rows of census/acs5_state.json) and anything
+else (rates/commercial-rates.html). The HTML fixtures are synthetic pages in the upstream formats;
+benchmarks/suite.py --record replaces them with captures of the live sites.
+"""
+import os
+import json
+import time
+import argparse
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+STUB_HOSTS = ['www.zillow.com', 'news.google.com', 'api.census.gov', 'www.commercialloandirect.com']
+
+# Fixture file served for each kind of upstream request
+FIXTURES = {
+    'zillow': os.path.join('zillow', 'listing.html'),
+    'news': os.path.join('news', 'search.html'),
+    'census': os.path.join('census', 'acs5_state.json'),
+    'rates': os.path.join('rates', 'commercial-rates.html'),
+}
+
+
+def host_overrides(base_url):
+    """HTTP_HOST_OVERRIDES value sending every stubbed host to `base_url`."""
+    return ','.join(f"{host}={base_url}" for host in STUB_HOSTS)
+
+
+def load_fixtures(fixtures_dir=FIXTURES_DIR):
+    fixtures = {}
+    for name, path in FIXTURES.items():
+        with open(os.path.join(fixtures_dir, path), encoding='utf-8') as f:
+            fixtures[name] = f.read()
+    return fixtures
+
+
+def census_rows(query, recorded):
+    """
+    ACS rows for the requested fields and codes. Recorded rows answer the codes and fields they
+    have; anything else (other geographies or variables) is filled in with a placeholder value.
+    """
+    header, rows = recorded[0], recorded[1:]
+    fields = query.get('get', ['NAME'])[0].split(',')
+    geography, _, codes = query.get('for', ['state:06'])[0].rpartition(':')
+    by_code = {row[-1]: dict(zip(header, row)) for row in rows} if geography == header[-1] else {}
+    codes = (list(by_code) or ['001']) if codes == '*' else codes.split(',')
+    # Parent geographies from `in` (e.g. state:06 for counties) come before the requested one, as upstream
+    parents = [clause.partition(':') for clause in query.get('in', [''])[0].split() if ':' in clause]
+    result = [fields + [name for name, _, _ in parents] + [geography]]
+    for code in codes:
+        row = by_code.get(code, {})
+        values = [row.get(field, f"Region {code}" if field == 'NAME' else '12345') for field in fields]
+        result.append(values + [value for _, _, value in parents] + [code])
+    return result
+
+
+def make_handler(latency, fixtures):
+    census = json.loads(fixtures['census'])
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes; without this, delayed ACKs add ~40ms per response
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            parts = urlsplit(self.path)
+            if parts.path.startswith('/homes/'):
+                self._send(fixtures['zillow'], 'text/html')
+            elif parts.path.startswith('/search'):
+                self._send(fixtures['news'], 'text/html')
+            elif parts.path.startswith('/data/'):
+                self._send(json.dumps(census_rows(parse_qs(parts.query), census)), 'application/json')
+            else:
+                self._send(fixtures['rates'], 'text/html')
+
+        def _send(self, body, content_type):
+            body = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def serve(port, latency, fixtures_dir=FIXTURES_DIR):
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(latency, load_fixtures(fixtures_dir)))
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every response')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR)
+    args = parser.parse_args()
+    serve(args.port, args.latency, args.fixtures)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,404 @@
+"""
+Reproducible benchmark suite: the scrapers, Census parsing, PDF extraction and the Flask
+endpoints, measured offline against benchmarks/stub_server.py serving benchmarks/fixtures.
+The HTML fixtures are hand-written stand-ins in each upstream's format (example.com links, an
+"Example Wire" news source, a made-up Zillow listing and rate table), so parse timings reflect
+their size and structure, not the live pages'. --record replaces them with real captures, and
+results from before and after a re-record aren't comparable.
+
+Each benchmark runs a few warm-up calls, then `iterations` timed calls one after another
+(latency percentiles and calls/sec), then a few more under tracemalloc for peak Python heap
+memory. Upstream scrapes use a new address or query each time so no cache answers them.
+
+- zillow.scrape, news.scrape, census.fetch and rates.fetch call the tool functions through
+  http_client, so they include the HTTP round trip to the local stub.
+- census.parse parses the fixture's state table repeated to county size (about 3,200 rows).
+- pdf.extract.* runs extract_data_from_pdf on generated rent rolls of 1, 10 and 50 pages. It
+  needs the spaCy model (SPACY_MODEL) and is skipped when the model can't be loaded; the model
+  that did load is recorded with the results.
+- http.* request the Flask app in-process through werkzeug's test client, with in-memory job
+  and document stores. Flask 2.0's own test client doesn't work with the pinned Werkzeug 2.2.
+
+Results can be saved as a baseline and later runs compared against it. A metric more than
+--threshold worse than the baseline (and by more than a small absolute margin) is reported as
+a regression, and so is a baseline benchmark missing from the run because it failed (unless
+--only left it out, or it is a pdf benchmark skipped for want of the spaCy model). Regressions
+make the exit status 1. Baselines only mean something on the machine they were recorded on,
+so none is committed: record one there first. A run with failed benchmarks isn't saved.
+
+    python benchmarks/suite.py --save-baseline            # record benchmarks/baseline.json
+    python benchmarks/suite.py                            # compare against it
+    python benchmarks/suite.py --only pdf,http --iterations 2.0 --output results.json
+    python benchmarks/suite.py --record                   # replace the fixtures with live captures
+
+Usage: python benchmarks/suite.py [--only PREFIXES] [--iterations SCALE] [--latency SECONDS]
+                                  [--baseline PATH] [--save-baseline] [--threshold 0.25]
+                                  [--output PATH] [--record]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import signal
+import argparse
+import platform
+import resource
+import tempfile
+import itertools
+import subprocess
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+from benchmarks.stub_server import FIXTURES_DIR, FIXTURES, host_overrides  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+WARMUP = 3
+MEMORY_ITERATIONS = 3
+# Differences smaller than these are noise, whatever the ratio
+MIN_LATENCY_DELTA_MS = 0.5
+MIN_MEMORY_DELTA_KB = 64
+
+# Live pages --record captures over the synthetic fixtures
+RECORD_URLS = {
+    'zillow': "https://www.zillow.com/homes/1140-E-Brickyard-Rd,-Salt-Lake-City,-UT-84106_rb/",
+    'news': "https://news.google.com/search?q=Commercial%20Real%20Estate%20News&hl=en-US&gl=US&ceid=US:en",
+    'census': "https://api.census.gov/data/2019/acs/acs5?get=NAME,B01003_001E&for=state:*",
+    'rates': "https://www.commercialloandirect.com/commercial-rates.php",
+}
+
+class ModelUnavailable(Exception):
+    """The spaCy model couldn't be loaded, so the benchmark is skipped rather than failed."""
+
+
+TENANTS = ["Acme Corp", "Blue Bottle Coffee", "Summit Dental Group", "Harbor Freight", "Pine & Oak LLC"]
+STATUSES = ["Paid rent", "Unpaid rent", "Open credit", "Prepaid cam", "Late charge"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_stub(port, latency):
+    stub = subprocess.Popen([sys.executable, os.path.join(ROOT, 'benchmarks', 'stub_server.py'),
+                             '--port', str(port), '--latency', str(latency)], start_new_session=True)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return stub
+        except OSError:
+            time.sleep(0.1)
+    stub.kill()
+    raise SystemExit("Stub server did not start")
+
+
+def configure_env(workdir, stub_url):
+    """Points every upstream at the stub and every store at scratch files, before the API is imported."""
+    os.environ.update({
+        'HTTP_HOST_OVERRIDES': host_overrides(stub_url),
+        'HTTP_MAX_RETRIES': '0',
+        'ZILLOW_RATE_LIMIT': '0',
+        'ZILLOW_STORE_PATH': os.path.join(workdir, 'zillow.sqlite3'),
+        'RATES_STORE_PATH': os.path.join(workdir, 'rates.sqlite3'),
+        'CENSUS_STORE_DIR': os.path.join(workdir, 'census'),
+        'NEWS_DATA_DIR': os.path.join(workdir, 'news'),
+        'LOG_FILE': os.path.join(workdir, 'api.log'),
+        'JOB_STORE': 'memory',
+        'DOCUMENT_STORE': 'memory',
+        'DOCUMENT_CACHE': 'sqlite',
+        'DOCUMENT_CACHE_PATH': os.path.join(workdir, 'documents.sqlite3'),
+        'DEFER_BACKGROUND_TASKS': '1',
+        'NEWS_REFRESH_INTERVAL': '0',
+        'RATES_REFRESH_INTERVAL': '0',
+    })
+
+
+def rent_roll_pdf(pages):
+    """A generated rent roll of `pages` pages, as PDF bytes."""
+    import fitz
+
+    doc = fitz.open()
+    for number in range(pages):
+        lines = [f"Rent Roll - Page {number + 1}", "Property: 1140 E Brickyard Rd, Salt Lake City, UT",
+                 "Occupancy rate: 94%", "NOI: $1,845,000", ""]
+        for row in range(40):
+            i = number * 40 + row
+            lines.append(f"{TENANTS[i % len(TENANTS)]} ${1000 + (i * 37) % 9000:,}.00 {STATUSES[i % len(STATUSES)]}")
+            lines.append(f"Unit {100 + i} note: lease expires 12/31/2027")
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(36, 36, 576, 756), "\n".join(lines), fontsize=6)
+    return doc.tobytes()
+
+
+def check(result):
+    """Fails the benchmark when a call returns an error instead of data."""
+    if isinstance(result, dict) and 'error' in result:
+        raise RuntimeError(result['error'])
+    return result
+
+
+def build_benchmarks():
+    """(name, setup, iterations) in run order; setup returns the call to time, taking a call number."""
+    def zillow_scrape():
+        from api.tools.zillow import scrape_zillow_data
+        return lambda n: check(scrape_zillow_data(f"{n} Benchmark Ave"))
+
+    def news_scrape():
+        from api.tools.news import scrape_google_news
+        return lambda n: check(scrape_google_news(f"Commercial Real Estate {n}"))
+
+    def census_fetch():
+        from api.tools.census import get_census_data
+        return lambda n: check(get_census_data(f"{n % 56 + 1:02d}"))
+
+    def census_parse():
+        from api.tools.census import parse_census_data
+        with open(os.path.join(FIXTURES_DIR, FIXTURES['census'])) as f:
+            recorded = json.load(f)
+        county_sized = recorded[:1] + recorded[1:] * 62
+        return lambda n: check(parse_census_data(county_sized))
+
+    def rates_fetch():
+        from api.tools.rates import fetch_interest_rates
+
+        def fetch(n):
+            if not fetch_interest_rates(fallback=False):
+                raise RuntimeError("No rates parsed")
+        return fetch
+
+    def pdf_extract(pages):
+        def setup():
+            from api.tools.nlp import get_nlp
+            from api.tools.extract_property_data import extract_data_from_pdf
+            try:
+                get_nlp()
+            except (OSError, ImportError) as e:
+                raise ModelUnavailable(e)
+            pdf = rent_roll_pdf(pages)
+            return lambda n: extract_data_from_pdf(pdf)
+        return setup
+
+    def http(path):
+        def setup():
+            from werkzeug.test import Client
+            from api.index import app
+            client = Client(app)
+
+            def call(n):
+                response = client.get(path.format(n=n))
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{path} returned {response.status_code}")
+            return call
+        return setup
+
+    return [
+        ('zillow.scrape', zillow_scrape, 50),
+        ('news.scrape', news_scrape, 50),
+        ('census.fetch', census_fetch, 50),
+        ('census.parse', census_parse, 200),
+        ('rates.fetch', rates_fetch, 50),
+        ('pdf.extract.1p', pdf_extract(1), 20),
+        ('pdf.extract.10p', pdf_extract(10), 10),
+        ('pdf.extract.50p', pdf_extract(50), 5),
+        ('http.zillow', http('/api/zillow?address={n} Endpoint Ave'), 50),
+        ('http.census', http('/census?region={n:02d}'), 50),
+        ('http.news', http('/api/news/national'), 200),
+        ('http.interest_rates', http('/api/interest-rates'), 200),
+        ('http.documents', http('/api/documents?limit=20'), 200),
+    ]
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(call, iterations, counter):
+    for _ in range(WARMUP):
+        call(next(counter))
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        call(next(counter))
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    # Measured separately: tracing allocations slows every call down
+    tracemalloc.start()
+    for _ in range(MEMORY_ITERATIONS):
+        call(next(counter))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    ordered = sorted(latencies)
+    return {
+        'iterations': iterations,
+        'p50_ms': percentile(ordered, 0.5) * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'per_sec': iterations / elapsed,
+        'peak_kb': peak / 1024,
+    }
+
+
+def selected(name, prefixes):
+    return not prefixes or any(name.startswith(prefix) for prefix in prefixes)
+
+
+def compare(results, baseline, threshold, prefixes=None):
+    """
+    Lines describing each change beyond `threshold`, and whether any of them is a regression.
+    Baseline benchmarks this run should have measured but didn't count as regressions, except
+    those skipped because the spaCy model is unavailable.
+    """
+    lines = []
+    regressed = False
+    for name in baseline['benchmarks']:
+        if name in results['benchmarks'] or not selected(name, prefixes):
+            continue
+        if name in results['skipped']:
+            lines.append(f"  {name}: skipped ({results['skipped'][name]}), not compared")
+        else:
+            regressed = True
+            lines.append(f"  REGRESSION {name}: missing from this run ({results['failed'].get(name, 'not run')})")
+    for name, result in results['benchmarks'].items():
+        before = baseline['benchmarks'].get(name)
+        if before is None:
+            lines.append(f"  {name}: not in baseline")
+            continue
+        for metric, floor in (('p50_ms', MIN_LATENCY_DELTA_MS), ('p95_ms', MIN_LATENCY_DELTA_MS),
+                              ('peak_kb', MIN_MEMORY_DELTA_KB)):
+            old, new = before[metric], result[metric]
+            if abs(new - old) < floor or old <= 0:
+                continue
+            change = new / old - 1
+            if change > threshold:
+                regressed = True
+                lines.append(f"  REGRESSION {name} {metric}: {old:.1f} -> {new:.1f} ({change:+.0%})")
+            elif change < -threshold:
+                lines.append(f"  improved   {name} {metric}: {old:.1f} -> {new:.1f} ({change:+.0%})")
+    return lines, regressed
+
+
+def environment():
+    """Where the run happened; spacy_model is the pipeline that actually loaded, if any did."""
+    from api.tools.nlp import loaded_models
+
+    models = loaded_models()
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'spacy_model': ', '.join(f"{name} {version}" for name, version in sorted(models.items())) or None,
+    }
+
+
+def record_fixtures():
+    """Saves the live upstream responses over the fixtures; failed fetches leave the fixture as it is."""
+    import requests
+
+    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                             "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
+    for name, url in RECORD_URLS.items():
+        try:
+            response = requests.get(url, headers=headers, timeout=30)
+        except requests.RequestException as e:
+            print(f"{name}: {e}; fixture kept")
+            continue
+        if response.status_code != 200:
+            print(f"{name}: HTTP {response.status_code}; fixture kept")
+            continue
+        path = os.path.join(FIXTURES_DIR, FIXTURES[name])
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        print(f"{name}: saved {len(response.text)} characters to {os.path.relpath(path, ROOT)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', help='comma-separated name prefixes, e.g. pdf,http.census')
+    parser.add_argument('--iterations', type=float, default=1.0, help='scale every benchmark\'s iteration count')
+    parser.add_argument('--latency', type=float, default=0.0, help='stub upstream latency (seconds)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='write the results to --baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='relative change counted as a regression')
+    parser.add_argument('--output', help='also write the results as JSON here')
+    parser.add_argument('--record', action='store_true', help='refresh the fixtures from the live sites and exit')
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures()
+        return
+
+    workdir = tempfile.mkdtemp(prefix='aicre_bench_')
+    port = free_port()
+    stub = start_stub(port, args.latency)
+    configure_env(workdir, f"http://127.0.0.1:{port}")
+    prefixes = [p.strip() for p in args.only.split(',')] if args.only else None
+
+    results = {'environment': None, 'latency': args.latency, 'benchmarks': {}, 'skipped': {}, 'failed': {}}
+    counter = itertools.count()
+    print(f"{'benchmark':<22} {'n':>5} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'calls/s':>9} {'peak KB':>9}")
+    try:
+        for name, setup, iterations in build_benchmarks():
+            if not selected(name, prefixes):
+                continue
+            try:
+                result = measure(setup(), max(1, int(iterations * args.iterations)), counter)
+            except ModelUnavailable as e:
+                print(f"{name:<22} skipped, spaCy model unavailable: {e}")
+                results['skipped'][name] = 'spaCy model unavailable'
+                continue
+            except Exception as e:
+                print(f"{name:<22} FAILED: {e}")
+                results['failed'][name] = str(e)
+                continue
+            results['benchmarks'][name] = result
+            print(f"{name:<22} {result['iterations']:>5} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+                  f"{result['p99_ms']:>9.2f} {result['per_sec']:>9.1f} {result['peak_kb']:>9.0f}")
+    finally:
+        os.killpg(stub.pid, signal.SIGTERM)
+        stub.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results['environment'] = environment()
+    results['max_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Peak process RSS: {results['max_rss_mb']:.0f} MB")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        if results['failed']:
+            raise SystemExit(f"Not saving a baseline: {', '.join(results['failed'])} failed")
+        if results['skipped']:
+            print(f"Warning: the baseline has no figures for {', '.join(results['skipped'])}")
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {os.path.relpath(args.baseline)}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against; record one with --save-baseline")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('environment') != results['environment'] or baseline.get('latency') != args.latency:
+        print("Note: the baseline was recorded with a different environment or stub latency")
+    lines, regressed = compare(results, baseline, args.threshold, prefixes)
+    print(f"Compared with {os.path.relpath(args.baseline)} (threshold {args.threshold:.0%}):")
+    print('\n'.join(lines) if lines else "  no changes beyond the threshold")
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
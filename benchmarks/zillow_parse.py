@@ -0,0 +1,127 @@
+"""
+Compares Zillow page parsing: the previous repeated select()/select_one() calls on a
+full html.parser tree against parse_zillow_page's single pass, with and without lxml
+and a SoupStrainer.
+
+Pages come from benchmarks/fixtures/zillow/*.html (save real pages there to benchmark
+them). Each fixture is also padded with unrelated markup to 0.5 MB and 2 MB, which is
+closer to the size of a live listing page. Outputs are checked for equality.
+
+Usage: python benchmarks/zillow_parse.py [--fixtures DIR] [--runs N]
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bs4 import BeautifulSoup
+from api.tools.zillow import parse_zillow_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'zillow')
+
+NOISE = (
+    '<div class="carousel-item"><a href="/homedetails/{i}_zpid/"><img src="/nearby/{i}.jpg">'
+    '<span class="list-card-price">${i},000</span><span class="list-card-addr">{i} Nearby Ave</span>'
+    '</a><script type="application/json">{{"zpid": {i}, "tracking": "{pad}"}}</script></div>\n'
+)
+
+
+def pad(html, size):
+    """Inserts unrelated listing cards before </body> until the page is about `size` bytes."""
+    filler = []
+    length = len(html)
+    i = 0
+    while length < size:
+        card = NOISE.format(i=i, pad='x' * 200)
+        filler.append(card)
+        length += len(card)
+        i += 1
+    return html.replace('</body>', ''.join(filler) + '</body>')
+
+
+def select_parse(html):
+    """The page parsing scrape_zillow_data did before the single-pass parser."""
+    soup = BeautifulSoup(html, 'html.parser')
+    price = soup.select_one('.ds-summary-row').text.strip() if soup.select_one('.ds-summary-row') else 'N/A'
+    address_details = soup.select_one('.ds-address-container').text.strip() if soup.select_one('.ds-address-container') else 'N/A'
+    property_type = soup.select_one('.ds-home-type').text.strip() if soup.select_one('.ds-home-type') else 'N/A'
+    property_size = soup.select_one('.ds-home-fact-list-item').text.strip() if soup.select_one('.ds-home-fact-list-item') else 'N/A'
+    zestimate = soup.select_one('.ds-estimate-value').text.strip() if soup.select_one('.ds-estimate-value') else 'N/A'
+    year_built = next((item.text for item in soup.select('.ds-home-fact-list-item') if 'Year Built' in item.text), 'N/A')
+    property_taxes = next((item.text for item in soup.select('.ds-home-fact-list-item') if 'Property Tax' in item.text), 'N/A')
+    image_tags = soup.select('.media-stream img')[:5]
+    images = [img['src'] for img in image_tags if img.get('src')]
+    return {
+        'price': price,
+        'address': address_details,
+        'property_type': property_type,
+        'property_size': property_size,
+        'zestimate': zestimate,
+        'year_built': year_built,
+        'property_taxes': property_taxes,
+        'images': images,
+    }
+
+
+def variants():
+    cases = {
+        'select + html.parser': select_parse,
+        'single pass + html.parser': lambda html: parse_zillow_page(html, 'html.parser', parse_only=False),
+        'single pass + html.parser + strainer': lambda html: parse_zillow_page(html, 'html.parser', parse_only=True),
+    }
+    try:
+        import lxml  # noqa: F401
+        cases['single pass + lxml'] = lambda html: parse_zillow_page(html, 'lxml', parse_only=False)
+        cases['single pass + lxml + strainer'] = lambda html: parse_zillow_page(html, 'lxml', parse_only=True)
+    except ImportError:
+        print("lxml not installed; skipping lxml cases")
+    return cases
+
+
+def measure(fn, html, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(html)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default=FIXTURES_DIR)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(args.fixtures, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        name = os.path.basename(path)
+        pages.append((name, html))
+        pages.append((f"{name} padded 0.5MB", pad(html, 500_000)))
+        pages.append((f"{name} padded 2MB", pad(html, 2_000_000)))
+
+    cases = variants()
+    for name, html in pages:
+        expected = select_parse(html)
+        print(f"\n{name} ({len(html) / 1000:.0f} KB)")
+        print(f"  {'parser':<38} {'time (ms)':>10} {'peak mem (MB)':>14}")
+        for case, fn in cases.items():
+            if fn(html) != expected:
+                raise SystemExit(f"{case} output differs from select + html.parser on {name}")
+            elapsed, peak = measure(fn, html, args.runs)
+            print(f"  {case:<38} {elapsed * 1000:>10.1f} {peak / 1e6:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+gunicorn settings for the Flask API. Every value can be overridden from the environment.
+
+The app is loaded once in the master (preload_app), so the spaCy model and other module-level
+resources are shared copy-on-write by the workers. Firebase clients and background threads
+don't survive a fork and are created in each worker instead.
+"""
+import os
+import multiprocessing
+
+# Background refreshers are started per worker in post_worker_init, not at import in the master
+os.environ['DEFER_BACKGROUND_TASKS'] = '1'
+os.environ.setdefault('PRELOAD_NLP', '1')
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5328')}")
+# Requests mostly wait on upstream HTTP, OpenAI and Firestore, so a few processes with
+# several threads each go further than many single-threaded processes
+workers = int(os.getenv('GUNICORN_WORKERS', str(min(4, multiprocessing.cpu_count() * 2 + 1))))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '60'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+# Recycle workers now and then to cap slow memory growth; jitter keeps them from restarting together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+# Set GUNICORN_ACCESSLOG to an empty string to turn access logging off
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+
+
+def post_worker_init(worker):
+    from api.wsgi import start_background_tasks
+    start_background_tasks()
+
+
+def worker_exit(server, worker):
+    # Let queued document jobs finish within graceful_timeout before the worker goes away
+    from api.wsgi import stop_background_tasks
+    stop_background_tasks(wait=True)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import the api package from the repository root, as api/index.py does
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
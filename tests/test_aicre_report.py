@@ -0,0 +1,39 @@
+import pytest
+
+from api.algos import sources
+from api.algos.aicre_report import generate_aicre_report
+from api.algos.sreo import DEFAULT_HOUSING_STOCK, DEFAULT_POPULATION_GROWTH
+
+
+@pytest.fixture
+def stub_sources(monkeypatch):
+    monkeypatch.setattr(sources, '_registry', {})
+    sources.register_stub_sources()
+
+    def census(data):
+        sources.register_source(sources.StubSource('census', data))
+    return census
+
+
+@pytest.mark.parametrize('census', [
+    {'housing': {'stock': None}, 'population': {'growth': None}},
+    {'housing': {'stock': 0}, 'population': {'growth': None}},
+    {'housing': {'stock': -5}},
+    {'housing': None, 'population': None},
+    {},
+])
+def test_missing_census_figures_fall_back_to_placeholders(stub_sources, census):
+    stub_sources(census)
+    report = generate_aicre_report('1 Main St', '06')
+
+    assert report['Housing Stock'] == DEFAULT_HOUSING_STOCK
+    assert report['Population Growth'] == DEFAULT_POPULATION_GROWTH
+    assert isinstance(report['SREO Index'], float)
+
+
+def test_census_figures_are_used_when_present(stub_sources):
+    stub_sources({'housing': {'stock': 5000.0}, 'population': {'growth': 0.01}})
+    report = generate_aicre_report('1 Main St', '06')
+
+    assert report['Housing Stock'] == 5000.0
+    assert report['Population Growth'] == 0.01
@@ -0,0 +1,131 @@
+import time
+import datetime
+import threading
+
+import pytest
+
+from api.documents import (DocumentWriter, MemoryDocumentIndex, encode_cursor, decode_cursor,
+                           parse_document_query, order_for)
+
+
+class RecordingIndex(MemoryDocumentIndex):
+    """MemoryDocumentIndex that remembers the size of every batch written to it."""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def write_many(self, records):
+        self.batches.append(len(records))
+        super().write_many(records)
+
+
+class FailingIndex:
+    def write_many(self, records):
+        raise RuntimeError("quota exceeded")
+
+
+def test_writer_commits_concurrent_adds_in_shared_batches():
+    index = RecordingIndex()
+    writer = DocumentWriter(index, batch_size=10, flush_interval=5)
+    futures = [writer.add({'id': str(i)}) for i in range(25)]
+    writer.stop()
+
+    assert [future.result(timeout=1) for future in futures] == [str(i) for i in range(25)]
+    assert index.batches == [10, 10, 5]
+
+
+def test_stop_flushes_a_partial_batch_without_waiting_for_the_interval():
+    index = RecordingIndex()
+    writer = DocumentWriter(index, batch_size=100, flush_interval=60)
+    futures = [writer.add({'id': str(i)}) for i in range(3)]
+
+    started = time.monotonic()
+    writer.stop(wait=True)
+
+    assert time.monotonic() - started < 5
+    assert index.batches == [3]
+    assert all(future.done() for future in futures)
+    assert index.get('2') == {'id': '2'}
+
+
+def test_failed_batch_fails_every_future_in_it():
+    writer = DocumentWriter(FailingIndex(), batch_size=10, flush_interval=5)
+    futures = [writer.add({'id': str(i)}) for i in range(3)]
+    writer.stop()
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="quota exceeded"):
+            future.result(timeout=1)
+
+
+def test_cancelled_document_is_not_written():
+    index = RecordingIndex()
+    writer = DocumentWriter(index, batch_size=10, flush_interval=5)
+    kept = writer.add({'id': 'kept'})
+    dropped = writer.add({'id': 'dropped'})
+    assert dropped.cancel()
+    writer.stop()
+
+    assert kept.result(timeout=1) == 'kept'
+    assert index.get('dropped') is None
+
+
+def test_add_raises_when_the_queue_stays_full():
+    index = RecordingIndex()
+    blocked = threading.Event()
+    index.write_many = lambda records: blocked.wait()
+    writer = DocumentWriter(index, batch_size=1, flush_interval=0, max_pending=1)
+    writer.add({'id': 'a'})
+    # Give the writer time to take 'a' and block on it, then fill the queue
+    time.sleep(0.1)
+    writer.add({'id': 'b'})
+    with pytest.raises(RuntimeError):
+        writer.add({'id': 'c'}, timeout=0.05)
+    blocked.set()
+    writer.stop()
+
+
+@pytest.mark.parametrize('value', [
+    datetime.datetime(2024, 5, 1, 12, 30, 15, 250000),
+    1250000.5,
+    42,
+    'main st',
+    None,
+])
+def test_cursor_round_trip(value):
+    cursor = encode_cursor({'id': 'abc123', 'field': value}, 'field')
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (value, 'abc123')
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor('not a cursor')
+    with pytest.raises(ValueError):
+        parse_document_query({'cursor': '!!!'})
+
+
+@pytest.mark.parametrize('args', [{}, {'min_noi': '0'}])
+def test_pages_follow_each_other_through_cursors(args):
+    index = MemoryDocumentIndex()
+    start = datetime.datetime(2024, 1, 1)
+    # Duplicate timestamps and NOIs so the id tie-breaker matters
+    index.write_many([{'id': f"{i:03d}", 'timestamp': start + datetime.timedelta(minutes=i // 3),
+                       'noi': float(i // 4)} for i in range(23)])
+
+    seen = []
+    cursor = None
+    while True:
+        query = parse_document_query(dict(args, limit='5', **({'cursor': cursor} if cursor else {})))
+        page = index.query(query)
+        seen.extend(record['id'] for record in page)
+        if len(page) < query['limit']:
+            break
+        cursor = encode_cursor(page[-1], order_for(query)[0])
+
+    field, descending = order_for(parse_document_query(args))
+    expected = sorted(index.query(dict(parse_document_query(args), limit=100)),
+                      key=lambda record: (record[field], record['id']), reverse=descending)
+    assert seen == [record['id'] for record in expected]
+    assert len(seen) == 23
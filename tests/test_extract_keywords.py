@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from api.tools.extract_property_data import KEYWORD_PATTERNS, match_keywords, keyword_dict
+
+# Text the keyword patterns look for, mixed with filler so matches land in different places
+FRAGMENTS = [
+    "Property: 1140 E Brickyard Rd, Salt Lake City, UT", "LOCATION 55 Main St", "address:",
+    "Acme Corp $1,250.00 Paid rent", "Blue Bottle Coffee -$980.50 Unpaid rent", "Open cam",
+    "Occupancy Rate: 95%", "occupancy rate 101%", "Lease Expiration: 12/31/2027", "lease end date 1/1/25",
+    "Square Footage: 12,500", "sq ft 900", "NOI: $1,200,000", "Net Operating Income 88,000.50",
+    "CapEx: $45,000", "capital expenditure 3,000", "Annual Rent: $240,000", "annual rental income 12",
+    "Monthly Rent: $20,000", "CAM: $1,500", "common area maintenance $300", "Late charge",
+    "Tenant Improvements: $12,000", "Management Fees 4,500", "Debt Service: $98,000",
+    "Property Tax: $22,000", "Insurance 7,800", "Vacancy Rate: 5%", "Maintenance Reserve $2,000",
+    "EGI: $310,000", "effective gross income 300,000", "Gross Rental Income: $320,000",
+    "Net Cash Flow: $75,000", "Prepaid CAM", "Shortpaid cam", "$75", "rent roll", "Total", "notes", "café résumé",
+    "Page 1 of 3", "\n", "  ", ":", "$", "%",
+]
+
+
+def per_pattern(text):
+    """The original extraction loop: one re.search per keyword pattern."""
+    matches = {}
+    for key, pattern in KEYWORD_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            matches[key] = match
+    return matches
+
+
+def assert_same_matches(text):
+    expected = per_pattern(text)
+    actual = match_keywords(text)
+    assert list(actual) == list(expected)
+    for key, match in expected.items():
+        assert actual[key].span() == match.span(), key
+        assert actual[key].groups() == match.groups(), key
+
+
+@pytest.mark.parametrize('text', [
+    "",
+    "nothing to see here",
+    "Address: 10 Downing St\nOccupancy rate: 88%\nNOI: $1,000\nAcme $5.00 Paid rent",
+    "NET OPERATING INCOME: 5,000 and later noi 6,000",
+    "café tenant $1,000 Open credit — occupancy rate 90%",
+    "sq ftsquare footage: 12",
+])
+def test_match_keywords_matches_per_pattern_search(text):
+    assert_same_matches(text)
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_match_keywords_matches_per_pattern_search_on_generated_text(seed):
+    rng = random.Random(seed)
+    text = ' '.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 60)))
+    if rng.random() < 0.5:
+        text = text.upper() if rng.random() < 0.5 else text.lower()
+    assert_same_matches(text)
+
+
+def test_every_keyword_is_covered():
+    text = '\n'.join(FRAGMENTS)
+    assert set(match_keywords(text)) == set(per_pattern(text))
+    assert set(per_pattern(text)) == set(keyword_dict)
@@ -0,0 +1,86 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from api.tools import http_client
+
+
+@pytest.fixture
+def upstream():
+    """Local server answering 503 (Retry-After: 0) to the first `failures` requests, then 200."""
+    state = {'failures': 0, 'paths': []}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            state['paths'].append(self.path)
+            if state['failures'] > 0:
+                state['failures'] -= 1
+                self._send(503, b'busy', {'Retry-After': '0'})
+            else:
+                self._send(200, b'ok')
+
+        def _send(self, status, body, headers=None):
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    http_client.set_host_override('upstream.test', f"http://127.0.0.1:{server.server_port}")
+    yield state
+    http_client._overrides.pop('upstream.test', None)
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def attempts():
+    events = []
+    http_client.add_metrics_hook(events.append)
+    yield events
+    http_client.remove_metrics_hook(events.append)
+
+
+def test_retryable_status_is_retried_until_it_succeeds(upstream, attempts):
+    upstream['failures'] = 2
+    response = http_client.get('http://upstream.test/search?q=cre', retries=3)
+
+    assert response.status_code == 200
+    assert [event['status'] for event in attempts] == [503, 503, 200]
+    assert upstream['paths'] == ['/search?q=cre'] * 3
+
+
+def test_last_response_is_returned_when_retries_run_out(upstream, attempts):
+    upstream['failures'] = 5
+    response = http_client.get('http://upstream.test/', retries=1)
+
+    assert response.status_code == 503
+    assert len(attempts) == 2
+
+
+def test_requests_to_a_host_share_one_session(upstream):
+    http_client.get('http://upstream.test/a', retries=0)
+    session = http_client.get_session('upstream.test')
+    http_client.get('http://upstream.test/b', retries=0)
+    assert http_client.get_session('upstream.test') is session
+
+
+def test_connection_errors_are_raised_after_the_last_attempt(attempts):
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    with pytest.raises(requests.ConnectionError):
+        http_client.get(f"http://127.0.0.1:{port}/", retries=0)
+    assert attempts[-1]['status'] is None and attempts[-1]['error']
@@ -0,0 +1,90 @@
+import time
+import threading
+
+import pytest
+
+from api.jobs import JobRunner, JobQueueFull, MemoryJobStore, PENDING, RUNNING, DONE, FAILED
+
+
+class RecordingStore(MemoryJobStore):
+    """MemoryJobStore that remembers every status a job passed through."""
+
+    def __init__(self):
+        super().__init__()
+        self.statuses = {}
+
+    def create(self, job):
+        self.statuses[job['id']] = [job['status']]
+        return super().create(job)
+
+    def update(self, job_id, **fields):
+        if 'status' in fields:
+            self.statuses[job_id].append(fields['status'])
+        return super().update(job_id, **fields)
+
+
+def test_successful_job_runs_through_pending_running_done():
+    store = RecordingStore()
+    runner = JobRunner(store, max_workers=1)
+    job = runner.submit('document', lambda a, b=0: a + b, 2, b=3, payload={'filename': 'a.pdf'})
+    runner.shutdown()
+
+    stored = store.get(job['id'])
+    assert store.statuses[job['id']] == [PENDING, RUNNING, DONE]
+    assert stored['result'] == 5
+    assert stored['error'] is None
+    assert stored['payload'] == {'filename': 'a.pdf'}
+
+
+def test_failing_job_is_marked_failed_with_its_error():
+    store = RecordingStore()
+    runner = JobRunner(store, max_workers=1)
+
+    def fail():
+        raise ValueError("bad document")
+
+    job = runner.submit('document', fail)
+    runner.shutdown()
+
+    stored = store.get(job['id'])
+    assert store.statuses[job['id']] == [PENDING, RUNNING, FAILED]
+    assert stored['error'] == "bad document"
+    assert stored['result'] is None
+
+
+def test_job_whose_result_cannot_be_stored_is_marked_failed():
+    class ResultTooLargeStore(RecordingStore):
+        def update(self, job_id, **fields):
+            if fields.get('status') == DONE:
+                raise ValueError("document exceeds 1 MiB")
+            return super().update(job_id, **fields)
+
+    store = ResultTooLargeStore()
+    runner = JobRunner(store, max_workers=1)
+    job = runner.submit('document', lambda: 'x' * 10)
+    runner.shutdown()
+
+    stored = store.get(job['id'])
+    assert store.statuses[job['id']] == [PENDING, RUNNING, FAILED]
+    assert stored['error'] == "Could not store the result: document exceeds 1 MiB"
+    assert runner.pending() == 0
+
+
+def test_submit_raises_once_max_pending_jobs_are_queued_or_running():
+    release = threading.Event()
+    runner = JobRunner(MemoryJobStore(), max_workers=1, max_pending=2)
+    runner.submit('document', release.wait)
+    runner.submit('document', release.wait)
+    with pytest.raises(JobQueueFull):
+        runner.submit('document', release.wait)
+    assert runner.pending() == 2
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while runner.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Finished jobs free their slots
+    assert runner.pending() == 0
+    job = runner.submit('document', lambda: 1)
+    runner.shutdown()
+    assert runner.store.get(job['id'])['status'] == DONE
@@ -0,0 +1,53 @@
+import time
+
+from api.tools.news_cache import NewsCache
+
+
+class FlakyFetch:
+    """Category fetch returning good news until `failing` is set, counting calls."""
+
+    def __init__(self):
+        self.calls = 0
+        self.failing = False
+
+    def __call__(self, category):
+        self.calls += 1
+        if self.failing:
+            return {'error': 'Failed to fetch data from Google News. Status code: 429'}
+        return {'articles': [{'title': f"{category} #{self.calls}"}]}
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_failed_refresh_keeps_old_news_and_is_not_retried_on_every_request():
+    fetch = FlakyFetch()
+    cache = NewsCache(fetch=fetch, ttl=0, snapshot=None, retry_after=60)
+    assert cache.get('finance') == {'articles': [{'title': 'finance #1'}]}
+
+    # ttl=0: the next request triggers a background refresh, which fails
+    fetch.failing = True
+    assert cache.get('finance') == {'articles': [{'title': 'finance #1'}]}
+    wait_for(lambda: fetch.calls == 2 and not cache._flight.in_flight('finance'))
+    assert fetch.calls == 2
+
+    # The failed attempt counts as fresh for retry_after, so these don't rescrape
+    for _ in range(5):
+        assert cache.get('finance') == {'articles': [{'title': 'finance #1'}]}
+    time.sleep(0.05)
+    assert fetch.calls == 2
+
+
+def test_first_scrape_failing_is_retried_after_retry_after():
+    fetch = FlakyFetch()
+    fetch.failing = True
+    cache = NewsCache(fetch=fetch, ttl=900, snapshot=None, retry_after=0)
+    assert 'error' in cache.get('finance')
+
+    fetch.failing = False
+    cache.get('finance')
+    wait_for(lambda: 'articles' in cache.get('finance'))
+    assert 'articles' in cache.get('finance')